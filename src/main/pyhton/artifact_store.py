@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from response_cache import make_cache_key
+
+# Rendered files and sections are stored once per content hash under objects/;
+# index.sqlite records which kit they belong to
+STORE_DIR = os.path.join("output", "store")
+
+HASH_CHUNK_SIZE = 1 << 20
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """Content-addressed store for generated kits with a SQLite manifest index
+    
+    Every object is written to a temporary file and renamed into place, so
+    readers never see partial files and identical content is kept once.
+    The manifest tables are indexed on the columns used for lookups, so
+    queries are B-tree searches rather than directory scans.
+    """
+    
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS kits ("
+            "kit_id TEXT PRIMARY KEY, request_key TEXT NOT NULL, company TEXT NOT NULL, topic TEXT NOT NULL, "
+            "style TEXT, scores TEXT NOT NULL, sections TEXT NOT NULL, created_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS kits_lookup ON kits (company, topic, style, created_at);"
+            "CREATE INDEX IF NOT EXISTS kits_topic ON kits (topic, created_at);"
+            "CREATE INDEX IF NOT EXISTS kits_request ON kits (request_key, created_at);"
+            "CREATE INDEX IF NOT EXISTS kits_created ON kits (created_at);"
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "kit_id TEXT NOT NULL, format TEXT NOT NULL, digest TEXT NOT NULL, extension TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "PRIMARY KEY (kit_id, format));"
+            "CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts (digest);"
+            "CREATE INDEX IF NOT EXISTS artifacts_format ON artifacts (format, kit_id);"
+        )
+        # Stores created before kits were localized lack the locale column
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(kits)")]
+        if "locale" not in columns:
+            self._conn.execute("ALTER TABLE kits ADD COLUMN locale TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kits_locale ON kits (locale, created_at)")
+        self._conn.commit()
+    
+    def object_path(self, digest, extension=""):
+        """Where the object with this content hash is stored"""
+        return os.path.join(self.objects_dir, digest[:2], digest[2:] + (f".{extension}" if extension else ""))
+    
+    def temp_path(self, extension=""):
+        """A unique scratch path inside the store, on the same filesystem as the objects"""
+        return os.path.join(self.tmp_dir, uuid.uuid4().hex + (f".{extension}" if extension else ""))
+    
+    def put_file(self, path, extension=""):
+        """Move a finished file into the store; returns its digest. Duplicates are discarded."""
+        digest = _hash_file(path)
+        target = self.object_path(digest, extension)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(path, target)
+        return digest
+    
+    def put_text(self, text, extension="txt"):
+        """Store a text blob such as a generated section; returns its digest"""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.object_path(digest, extension)
+        if not os.path.exists(target):
+            temp_path = self.temp_path(extension)
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+        return digest
+    
+    def record_kit(self, request_key, company, topic, style, scores, sections, artifacts, locale=None):
+        """Index a generated kit
+        
+        `sections` maps section names to text; `artifacts` maps formats to
+        (digest, extension) pairs of files already in the store. Returns the kit id.
+        """
+        kit_id = uuid.uuid4().hex
+        section_digests = {name: self.put_text(text) for name, text in sections.items()}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO kits (kit_id, request_key, company, topic, style, locale, scores, sections, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kit_id, request_key, company, topic, style, locale, json.dumps(scores), json.dumps(section_digests),
+                 time.time())
+            )
+            self._conn.executemany(
+                "INSERT INTO artifacts (kit_id, format, digest, extension, size) VALUES (?, ?, ?, ?, ?)",
+                [(kit_id, fmt, digest, extension, os.path.getsize(self.object_path(digest, extension)))
+                 for fmt, (digest, extension) in artifacts.items()]
+            )
+            self._conn.commit()
+        return kit_id
+    
+    def _kit_rows(self, where, parameters, limit):
+        with self._lock:
+            kits = self._conn.execute(
+                f"SELECT kit_id, company, topic, style, locale, scores, sections, created_at FROM kits {where} "
+                f"ORDER BY created_at DESC LIMIT ?", (*parameters, limit)
+            ).fetchall()
+            results = []
+            for kit_id, company, topic, style, locale, scores, sections, created_at in kits:
+                artifacts = self._conn.execute(
+                    "SELECT format, digest, extension FROM artifacts WHERE kit_id = ?", (kit_id,)
+                ).fetchall()
+                results.append({
+                    "kit_id": kit_id,
+                    "company": company,
+                    "topic": topic,
+                    "style": style,
+                    "locale": locale,
+                    "scores": json.loads(scores),
+                    "sections": json.loads(sections),
+                    "created_at": created_at,
+                    "files": {fmt: self.object_path(digest, extension) for fmt, digest, extension in artifacts}
+                })
+        return results
+    
+    def find_kits(self, company=None, topic=None, style=None, output_format=None, limit=20, locale=None):
+        """Newest kits matching the given fields, with the paths of their stored files"""
+        conditions, parameters = [], []
+        for column, value in (("company", company), ("topic", topic), ("style", style), ("locale", locale)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        if output_format is not None:
+            conditions.append("kit_id IN (SELECT kit_id FROM artifacts WHERE format = ?)")
+            parameters.append(output_format)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._kit_rows(where, parameters, limit)
+    
+    def find_by_request(self, request_key, output_formats):
+        """The newest kit generated for exactly this request that has every format in `output_formats`"""
+        for kit in self._kit_rows("WHERE request_key = ?", (request_key,), 10):
+            if all(fmt in kit["files"] and os.path.exists(kit["files"][fmt]) for fmt in output_formats):
+                return kit
+        return None
+
+def kit_request_key(company_info, press_kit_info, style, supplementary, locale=None):
+    """Identify the inputs a kit was generated from, so an identical request can reuse it"""
+    if locale is None:
+        return make_cache_key("kit", company_info, press_kit_info, style, bool(supplementary))
+    return make_cache_key("kit", company_info, press_kit_info, style, bool(supplementary), locale)
+
+def publish(source, destination):
+    """Copy a stored file to its user-facing path atomically, so readers never see a partial file"""
+    directory = os.path.dirname(destination) or "."
+    temp_path = os.path.join(directory, f".{os.path.basename(destination)}.{uuid.uuid4().hex}.tmp")
+    shutil.copyfile(source, temp_path)
+    os.replace(temp_path, destination)
+    return destination
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """The artifact store of the current working directory, opened once per process"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import STYLE_OPTIONS, OUTPUT_FORMATS, DEFAULT_FORMAT
+from data_collector import build_data
+from content_generator import generate_content_for_style
+from quality_reviewer import review_press_kit
+from output_formatter import save_kit
+from localization import localize_content, parse_locales
+from artifact_store import get_store, kit_request_key
+from parallel import DEFAULT_MAX_WORKERS
+from tracing import span
+
+# Number of press kits processed at the same time
+DEFAULT_BATCH_WORKERS = 4
+
+COMPANY_FIELDS = ["name", "product", "achievements", "brand_attributes"]
+PRESS_KIT_FIELDS = ["topic", "target_media", "tone"]
+
+def _parse_bool(value, default=True):
+    """Interpret manifest flags such as 'Y', 'yes', 'true' or '0'"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("y", "yes", "true", "1")
+
+def _parse_formats(value, default_formats):
+    """Accept a list of formats or a string separated by commas or semicolons"""
+    if not value:
+        return list(default_formats)
+    if isinstance(value, str):
+        value = value.replace(";", ",").split(",")
+    return [fmt.strip() for fmt in value if fmt.strip()]
+
+def load_manifest(path):
+    """Load batch records from a JSONL or CSV manifest"""
+    records = []
+    
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                records.append({
+                    "id": row.get("id"),
+                    "company_info": {field: row.get(field, "") for field in COMPANY_FIELDS},
+                    "press_kit_info": {field: row.get(field, "") for field in PRESS_KIT_FIELDS},
+                    "style": row.get("style"),
+                    "output_formats": row.get("output_formats") or row.get("output_format"),
+                    "locales": row.get("locales"),
+                    "supplementary": row.get("supplementary")
+                })
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+    
+    return records
+
+def normalize_record(record, index, default_formats=(DEFAULT_FORMAT,), default_locales=()):
+    """Validate a manifest record and fill in defaults"""
+    company_info = record.get("company_info") or {}
+    press_kit_info = record.get("press_kit_info") or {}
+    
+    missing = [f"company_info.{field}" for field in COMPANY_FIELDS if field not in company_info]
+    missing += [f"press_kit_info.{field}" for field in PRESS_KIT_FIELDS if field not in press_kit_info]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    
+    style = record.get("style") or STYLE_OPTIONS[0]
+    matches = [s for s in STYLE_OPTIONS if s.lower() == str(style).lower()]
+    if not matches:
+        raise ValueError(f"unknown style '{style}', expected one of {', '.join(STYLE_OPTIONS)}")
+    
+    output_formats = _parse_formats(record.get("output_formats") or record.get("output_format"), default_formats)
+    unsupported = [fmt for fmt in output_formats if fmt not in OUTPUT_FORMATS]
+    if unsupported:
+        raise ValueError(f"unsupported output formats: {', '.join(unsupported)}")
+    
+    locales = parse_locales(record.get("locales")) if record.get("locales") else list(default_locales)
+    
+    return {
+        "id": str(record.get("id") or index),
+        "company_info": {field: company_info[field] for field in COMPANY_FIELDS},
+        "press_kit_info": {field: press_kit_info[field] for field in PRESS_KIT_FIELDS},
+        "style": matches[0],
+        "output_formats": output_formats,
+        "locales": locales,
+        "supplementary": _parse_bool(record.get("supplementary"))
+    }
+
+def run_record(record, max_workers=DEFAULT_MAX_WORKERS, mode="standard", on_stage=None, journal=None,
+               reuse=False):
+    """Run the collect -> generate -> review -> save pipeline for one record
+    
+    `on_stage`, if given, is called with each stage name as the stage starts.
+    With a `journal`, stages it already holds are skipped and new ones are saved to it.
+    With `reuse`, a kit already in the artifact store for the same inputs is
+    returned instead of generating a new one. Each of the record's `locales`
+    gets a translated copy of the kit, saved next to the source-language one.
+    The reported output files are the kit's content-addressed files in the
+    store, which no later run can overwrite.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    run_stage = journal.stage if journal is not None else (lambda stage, compute: compute())
+    request_keys = {
+        locale: kit_request_key(record["company_info"], record["press_kit_info"], record["style"],
+                                record["supplementary"], locale)
+        for locale in [None] + record["locales"]
+    }
+    
+    if reuse:
+        store = get_store()
+        kits = {locale: store.find_by_request(key, record["output_formats"]) for locale, key in request_keys.items()}
+        if all(kit is not None for kit in kits.values()):
+            return {
+                "scores": kits[None]["scores"],
+                "output_files": [kit["files"][fmt] for kit in kits.values() for fmt in record["output_formats"]],
+                "kit_id": kits[None]["kit_id"],
+                "reused": True
+            }
+    
+    on_stage("collect")
+    with span("stage:collect", "stage", record=record["id"]):
+        data = run_stage("data", lambda: build_data(record["company_info"], record["press_kit_info"],
+                                                    record["supplementary"]))
+    on_stage("generate")
+    with span("stage:generate", "stage", record=record["id"]):
+        # Sections are journaled one by one, so a failed call only costs that section on --resume
+        sections_journal = journal.child("content") if journal is not None else None
+        content = run_stage("content", lambda: generate_content_for_style(data, record["style"], max_workers, mode,
+                                                                          sections_journal))
+    on_stage("review")
+    with span("stage:review", "stage", record=record["id"]):
+        review_result = run_stage("review", lambda: review_press_kit(content, max_workers, data=data))
+    on_stage("save")
+    with span("stage:save", "stage", record=record["id"]):
+        kit = run_stage("output", lambda: save_kit(data, content, review_result, record["output_formats"],
+                                                   request_keys[None]))
+    
+    output_files = [kit["files"][fmt] for fmt in record["output_formats"]]
+    if record["locales"]:
+        on_stage("localize")
+        with span("stage:localize", "stage", record=record["id"]):
+            localized = run_stage("localized", lambda: localize_content(content, record["locales"], max_workers))
+            for locale, localized_content in localized.items():
+                localized_kit = save_kit(data, localized_content, review_result, record["output_formats"],
+                                         request_keys[locale], locale)
+                output_files += [localized_kit["files"][fmt] for fmt in record["output_formats"]]
+    
+    return {
+        "scores": review_result["scores"],
+        "output_files": output_files,
+        "kit_id": kit["kit_id"],
+        "reused": False
+    }
+
+def run_batch(records, results_path, workers=DEFAULT_BATCH_WORKERS, max_workers=DEFAULT_MAX_WORKERS,
+              default_formats=(DEFAULT_FORMAT,), mode="standard", journal=None, reuse=False, default_locales=()):
+    """Generate press kits for many manifest records with a bounded worker pool
+    
+    Every record produces one JSON line in `results_path`, written as soon as
+    the record finishes, so a partially completed batch keeps its results.
+    With a `journal`, each record's stages are journaled under its id, and
+    a resumed batch only redoes the stages that did not finish. With `reuse`,
+    records whose kit is already in the artifact store are not generated again.
+    """
+    results_dir = os.path.dirname(results_path)
+    if results_dir and not os.path.exists(results_dir):
+        os.makedirs(results_dir)
+    
+    summary = {"succeeded": 0, "failed": 0}
+    
+    def process(index, raw_record):
+        started = time.time()
+        result = {"id": str(index)}
+        try:
+            if not isinstance(raw_record, dict):
+                raise ValueError("manifest record must be a JSON object")
+            result["id"] = str(raw_record.get("id") or index)
+            record = normalize_record(raw_record, index, default_formats, default_locales)
+            result["id"] = record["id"]
+            record_journal = journal.child(record["id"]) if journal is not None else None
+            result.update(run_record(record, max_workers, mode, journal=record_journal, reuse=reuse))
+            result["status"] = "success"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            result["traceback"] = traceback.format_exc()
+        result["duration_seconds"] = round(time.time() - started, 3)
+        return result
+    
+    with open(results_path, "w", encoding="utf-8") as results_file:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(process, index, record) for index, record in enumerate(records, 1)]
+            for future in as_completed(futures):
+                result = future.result()
+                results_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results_file.flush()
+                summary["succeeded" if result["status"] == "success" else "failed"] += 1
+                print(f"[Batch] Record {result['id']}: {result['status']} "
+                      f"({summary['succeeded'] + summary['failed']}/{len(records)})")
+    
+    return summary
@@ -0,0 +1,320 @@
+import builtins
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import click
+from config import STYLE_OPTIONS, OUTPUT_FORMATS, DEFAULT_FORMAT
+import data_collector
+import gemini_client
+from data_collector import collect_all_data
+from content_generator import generate_all_content
+from quality_reviewer import review_press_kit
+from output_formatter import save_output
+from parallel import DEFAULT_MAX_WORKERS
+from response_cache import configure_cache
+from call_scheduler import configure_scheduler
+
+STAGES = ["collect", "generate", "review", "save", "total"]
+
+REVIEW_TEMPLATE = """Content Consistency: {0}/10
+Consistent messaging across sections.
+
+Writing Style and Tone: {1}/10
+Tone matches the target media.
+
+Layout and Structure: {2}/10
+Clear structure with short paragraphs.
+
+SEO Optimization: {3}/10
+Key terms appear in the opening paragraph.
+
+Overall Feedback:
+{4}"""
+
+class StubBackendError(ConnectionError):
+    """Raised by the stub backends to simulate a transient API failure"""
+
+class StubSettings:
+    """Latency, jitter, failure rate and response size shared by the stub backends"""
+    
+    def __init__(self, latency=0.5, jitter=0.1, failure_rate=0.0, response_size=1500,
+                 search_latency=0.3, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.response_size = response_size
+        self.search_latency = search_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def delay(self, base):
+        """Sleep for `base` seconds plus uniform jitter"""
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter)
+        time.sleep(max(0.0, base + offset))
+    
+    def maybe_fail(self, what):
+        """Raise a StubBackendError with the configured probability"""
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise StubBackendError(f"Simulated {what} failure")
+    
+    def text(self, seed_text):
+        """Build a response of roughly `response_size` characters in paragraphs"""
+        sentence = f"{seed_text.strip()[:60]} continues to deliver measurable results for its customers. "
+        paragraph = sentence * 3
+        paragraphs = []
+        while sum(len(p) + 2 for p in paragraphs) < self.response_size:
+            paragraphs.append(paragraph.strip())
+        return "\n\n".join(paragraphs)[:self.response_size]
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubGeminiModel:
+    """Offline stand-in for genai.GenerativeModel"""
+    
+    def __init__(self, model_name, settings, generation_config=None):
+        self.model_name = model_name
+        self._generation_config = generation_config or {}
+        self.settings = settings
+    
+    def _respond(self, prompt):
+        if "Content Consistency" in prompt:
+            return REVIEW_TEMPLATE.format(8, 7, 9, 6, self.settings.text("The press kit"))
+        return self.settings.text(prompt)
+    
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.settings.maybe_fail("Gemini")
+        text = self._respond(prompt)
+        
+        if not stream:
+            self.settings.delay(self.settings.latency)
+            return _StubResponse(text)
+        
+        def chunks():
+            # Half of the latency before the first token, the rest spread over the chunks
+            self.settings.delay(self.settings.latency / 2)
+            pieces = [text[i:i + 200] for i in range(0, len(text), 200)] or [""]
+            for piece in pieces:
+                time.sleep(self.settings.latency / 2 / len(pieces))
+                yield _StubResponse(piece)
+        return chunks()
+
+class StubGoogleSearch:
+    """Offline stand-in for serpapi.GoogleSearch"""
+    
+    settings = None
+    
+    def __init__(self, params):
+        self.params = params
+    
+    def get_dict(self):
+        self.settings.maybe_fail("SerpAPI")
+        self.settings.delay(self.settings.search_latency)
+        return {
+            "news_results": [
+                {"title": f"{self.params['q']} headline {index}", "source": f"Wire {index}"}
+                for index in range(1, self.params.get("num", 3) + 1)
+            ]
+        }
+
+@contextlib.contextmanager
+def stub_backends(settings):
+    """Replace Gemini and SerpAPI with the stub backends for the duration of the block"""
+    models = {}
+    models_lock = threading.Lock()
+    
+    def get_stub_model(model_name=gemini_client.GEMINI_MODEL, generation_config=None):
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True))
+        with models_lock:
+            if key not in models:
+                models[key] = StubGeminiModel(model_name, settings, generation_config)
+            return models[key]
+    
+    StubGoogleSearch.settings = settings
+    original_model = gemini_client.get_gemini_model
+    original_search = data_collector.GoogleSearch
+    gemini_client.get_gemini_model = get_stub_model
+    data_collector.GoogleSearch = StubGoogleSearch
+    try:
+        yield
+    finally:
+        gemini_client.get_gemini_model = original_model
+        data_collector.GoogleSearch = original_search
+
+# Each worker thread answers input() prompts from its own script
+_scripts = threading.local()
+
+def _scripted_input(prompt=""):
+    answers = getattr(_scripts, "answers", None)
+    if not answers:
+        raise RuntimeError(f"No scripted answer for prompt: {prompt!r}")
+    return answers.pop(0)
+
+def kit_script(index):
+    """Answers for the interactive prompts of one press kit run"""
+    return [
+        # Company information, then confirmation
+        f"Benchmark Company {index}", "Analytics platform", "Series B funding, 1M users",
+        "innovative, reliable, transparent", "Y",
+        # Press kit topic, then confirmation
+        f"Product launch {index}", "Technology press", "professional", "Y",
+        # Include supplementary data
+        "Y",
+        # Preferred style
+        STYLE_OPTIONS[index % len(STYLE_OPTIONS)]
+    ]
+
+def run_kit(index, output_formats, max_workers):
+    """Run one press kit through every stage and return per-stage timings"""
+    _scripts.answers = kit_script(index)
+    timings = {}
+    started = time.perf_counter()
+    
+    stage_started = time.perf_counter()
+    data = collect_all_data()
+    timings["collect"] = time.perf_counter() - stage_started
+    
+    stage_started = time.perf_counter()
+    content = generate_all_content(data, max_workers)
+    timings["generate"] = time.perf_counter() - stage_started
+    
+    stage_started = time.perf_counter()
+    review_result = review_press_kit(content, max_workers, data=data)
+    timings["review"] = time.perf_counter() - stage_started
+    
+    stage_started = time.perf_counter()
+    save_output(data, content, review_result, output_formats)
+    timings["save"] = time.perf_counter() - stage_started
+    
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def run_benchmark(kits, concurrency, settings, output_formats=(DEFAULT_FORMAT,), max_workers=DEFAULT_MAX_WORKERS):
+    """Generate `kits` press kits against the stub backends and summarise the run"""
+    results = []
+    failures = []
+    
+    def worker(index):
+        try:
+            results.append(run_kit(index, list(output_formats), max_workers))
+        except Exception as e:
+            failures.append(f"{type(e).__name__}: {e}")
+    
+    original_input = builtins.input
+    builtins.input = _scripted_input
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with stub_backends(settings), contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(worker, range(kits)))
+    finally:
+        wall_time = time.perf_counter() - started
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        builtins.input = original_input
+    
+    summary = {
+        "kits": kits,
+        "concurrency": concurrency,
+        "succeeded": len(results),
+        "failed": len(failures),
+        "errors": sorted(set(failures)),
+        "wall_time": wall_time,
+        "kits_per_minute": len(results) / wall_time * 60 if wall_time else 0.0,
+        "peak_traced_memory_mb": peak_traced / (1024 * 1024),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": {}
+    }
+    for stage in STAGES:
+        values = [timing[stage] for timing in results]
+        summary["stages"][stage] = {
+            name: percentile(values, pct) for name, pct in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99))
+        }
+    
+    return summary
+
+def display_summary(summary):
+    """Print one benchmark run as a table"""
+    print(f"\n[Benchmark: {summary['kits']} kits, concurrency {summary['concurrency']}]\n")
+    print(f"{'Stage':<10} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9}")
+    for stage, values in summary["stages"].items():
+        cells = [f"{values[name]:.3f}s" if values[name] is not None else "-" for name in ("p50", "p90", "p95", "p99")]
+        print(f"{stage:<10} " + " ".join(f"{cell:>9}" for cell in cells))
+    
+    print(f"\nSucceeded: {summary['succeeded']}  Failed: {summary['failed']}")
+    for error in summary["errors"]:
+        print(f"  {error}")
+    print(f"Wall time: {summary['wall_time']:.2f}s  Throughput: {summary['kits_per_minute']:.1f} kits/minute")
+    print(f"Peak traced memory: {summary['peak_traced_memory_mb']:.1f} MB  Peak RSS: {summary['peak_rss_mb']:.1f} MB")
+
+@click.command()
+@click.option('--kits', '-n', type=click.IntRange(min=1), multiple=True, default=[1, 25],
+              help='Number of press kits per run; repeat for several runs')
+@click.option('--concurrency', '-c', type=click.IntRange(min=1), default=4,
+              help='Press kits generated at the same time in many-kit runs')
+@click.option('--max-workers', '-w', type=click.IntRange(min=1), default=DEFAULT_MAX_WORKERS,
+              help='Concurrent stub Gemini calls per press kit')
+@click.option('--latency', type=click.FloatRange(min=0), default=0.5, help='Stub Gemini latency in seconds')
+@click.option('--jitter', type=click.FloatRange(min=0), default=0.1, help='Uniform latency jitter in seconds')
+@click.option('--failure-rate', type=click.FloatRange(0, 1), default=0.0, help='Probability a stub call fails')
+@click.option('--response-size', type=click.IntRange(min=1), default=1500, help='Characters per stub response')
+@click.option('--search-latency', type=click.FloatRange(min=0), default=0.3, help='Stub SerpAPI latency in seconds')
+@click.option('--output-format', '-f', type=click.Choice(OUTPUT_FORMATS), multiple=True, default=[DEFAULT_FORMAT],
+              help='Formats rendered for each kit')
+@click.option('--seed', type=int, default=None, help='Seed for jitter and failures')
+@click.option('--use-cache', is_flag=True, default=False, help='Keep the response and search caches enabled')
+@click.option('--requests-per-minute', type=click.IntRange(min=0), default=0,
+              help='Client-side request limit applied to the stub; 0 disables it')
+@click.option('--max-retries', type=click.IntRange(min=0), default=0, help='Retries for failed stub calls')
+@click.option('--hedge', is_flag=True, default=False, help='Hedge stub calls slower than the p95 latency')
+@click.option('--json-output', type=click.Path(dir_okay=False), default=None, help='Also write the results as JSON')
+def main(kits, concurrency, max_workers, latency, jitter, failure_rate, response_size, search_latency,
+         output_format, seed, use_cache, requests_per_minute, max_retries, hedge, json_output):
+    """Offline end-to-end PressAgent benchmark with stub Gemini and SerpAPI backends"""
+    settings = StubSettings(latency, jitter, failure_rate, response_size, search_latency, seed)
+    json_output = os.path.abspath(json_output) if json_output else None
+    summaries = []
+    
+    # Run inside a scratch directory so outputs and caches do not touch the working tree
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="pressagent-bench-") as scratch:
+        os.chdir(scratch)
+        try:
+            configure_cache(enabled=use_cache)
+            configure_scheduler(requests_per_minute, None, max_retries, hedge)
+            for kit_count in kits:
+                summary = run_benchmark(kit_count, 1 if kit_count == 1 else concurrency, settings,
+                                        output_format, max_workers)
+                display_summary(summary)
+                summaries.append(summary)
+        finally:
+            os.chdir(original_cwd)
+    
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\nResults saved at: {json_output}")
+
+if __name__ == '__main__':
+    main()
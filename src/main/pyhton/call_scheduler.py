@@ -0,0 +1,177 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Defaults sized to the Gemini quota; override with configure_scheduler()
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = None  # None disables the token limit
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# Hedging needs enough samples for a meaningful p95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+HEDGE_WORKERS = 64
+
+_retryable_errors = None
+
+def retryable_errors():
+    """Errors worth retrying: quota (429), overload (503), timeouts and dropped connections
+    
+    google.api_core is slow to import, so the tuple is built on the first call.
+    """
+    global _retryable_errors
+    if _retryable_errors is None:
+        from google.api_core import exceptions as api_exceptions
+        _retryable_errors = (
+            api_exceptions.ResourceExhausted,
+            api_exceptions.TooManyRequests,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.InternalServerError,
+            api_exceptions.DeadlineExceeded,
+            api_exceptions.GatewayTimeout,
+            ConnectionError,
+            TimeoutError
+        )
+    return _retryable_errors
+
+class PartialResponseError(RuntimeError):
+    """A streamed call failed after delivering output, so it cannot be retried safely"""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units per minute"""
+    
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+        self._condition = threading.Condition()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def acquire(self, amount=1):
+        """Block until `amount` units are available, then take them; returns the time spent waiting"""
+        amount = min(float(amount), self.capacity)
+        started = time.monotonic()
+        with self._condition:
+            self._refill()
+            while self.available < amount:
+                self._condition.wait((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+        return time.monotonic() - started
+
+class CallScheduler:
+    """Rate-limits, retries and optionally hedges calls to a rate-limited API"""
+    
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 hedge=False):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._latencies_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedged-call") if hedge else None
+    
+    def _acquire(self, tokens):
+        """Wait for quota for one request of `tokens` tokens"""
+        waited = 0.0
+        if self.request_bucket is not None:
+            waited += self.request_bucket.acquire(1)
+        if self.token_bucket is not None and tokens:
+            waited += self.token_bucket.acquire(tokens)
+        return waited
+    
+    def _record_latency(self, latency):
+        with self._latencies_lock:
+            self._latencies.append(latency)
+    
+    def p95_latency(self):
+        """The 95th percentile of recent successful call latencies, or None without enough samples"""
+        with self._latencies_lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+    
+    def backoff_delay(self, attempt):
+        """Exponential backoff with full jitter for the given retry attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def _run_hedged(self, fn, tokens, stats):
+        """Run `fn`, sending a duplicate if it outlives the p95 latency; the first success wins"""
+        threshold = self.p95_latency()
+        primary = self._hedge_executor.submit(fn)
+        if threshold is None:
+            return primary.result()
+        
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        
+        self._acquire(tokens)
+        stats["hedged"] = True
+        pending = {primary, self._hedge_executor.submit(fn)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def call(self, fn, tokens=0, stats=None, hedge=True):
+        """Call `fn` within the rate limits, retrying transient failures with backoff
+        
+        `tokens` is the estimated token cost of the call. `stats` (a dict)
+        receives the retry count, time spent waiting for quota and whether
+        the call was hedged. Pass `hedge=False` for calls with side effects.
+        """
+        stats = {} if stats is None else stats
+        stats.setdefault("retries", 0)
+        stats.setdefault("rate_limit_wait", 0.0)
+        
+        retryable = retryable_errors()
+        for attempt in range(self.max_retries + 1):
+            stats["rate_limit_wait"] += self._acquire(tokens)
+            started = time.perf_counter()
+            try:
+                if self.hedge and hedge:
+                    result = self._run_hedged(fn, tokens, stats)
+                else:
+                    result = fn()
+            except retryable:
+                if attempt == self.max_retries:
+                    raise
+                stats["retries"] += 1
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            
+            self._record_latency(time.perf_counter() - started)
+            return result
+
+_scheduler = CallScheduler()
+_scheduler_lock = threading.Lock()
+
+def configure_scheduler(requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                        max_retries=DEFAULT_MAX_RETRIES, hedge=False):
+    """Replace the shared scheduler used for every Gemini call"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = CallScheduler(requests_per_minute, tokens_per_minute, max_retries, hedge=hedge)
+
+def get_scheduler():
+    """Get the shared scheduler"""
+    return _scheduler
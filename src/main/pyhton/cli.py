@@ -1,23 +1,149 @@
+import time
 import click
-from config import OUTPUT_FORMATS, DEFAULT_FORMAT
+from config import OUTPUT_FORMATS, DEFAULT_FORMAT, STYLE_OPTIONS
 from data_collector import collect_all_data
-from content_generator import generate_all_content
-from quality_reviewer import review_press_kit, display_review_report
+from content_generator import (generate_all_content, start_background_sections, GENERATION_MODES,
+                               STYLE_INDEPENDENT_SECTIONS)
+from quality_reviewer import (review_press_kit, display_review_report, configure_review_policy, REVIEW_POLICIES,
+                              REVIEW_SECTIONS, DEFAULT_ACCEPT_ABOVE, DEFAULT_REJECT_BELOW)
 from output_formatter import save_output
+from localization import localize_content, parse_locales
+from parallel import DEFAULT_MAX_WORKERS
+from response_cache import (configure_cache, get_semantic_cache, DEFAULT_TTL, DEFAULT_MAX_ENTRIES,
+                            DEFAULT_SEMANTIC_THRESHOLD)
+from batch import load_manifest, run_batch, DEFAULT_BATCH_WORKERS
+from server import create_server, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_QUEUE_SIZE
+from gemini_client import display_generation_metrics
+from run_journal import open_journal
+from artifact_store import get_store
+from revision import revise_press_kit, requested_sections, DEFAULT_REVISION_THRESHOLD, DEFAULT_REVISION_ROUNDS
+from model_router import (configure_router, display_router_health, CALL_SITES, TIER_ORDER, DEFAULT_FAST_MODEL,
+                          DEFAULT_LATENCY_BUDGET)
+from tracing import enable_tracing, span, write_trace, display_trace_summary
+from call_scheduler import (configure_scheduler, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE,
+                            DEFAULT_MAX_RETRIES)
 
-@click.command()
-@click.option('--output-format', '-f', type=click.Choice(OUTPUT_FORMATS), default=DEFAULT_FORMAT,
-              help='Output format for the press kit')
-def main(output_format):
+def parse_routes(ctx, param, values):
+    """Turn repeated SITE=TIER options into a routes dict"""
+    routes = {}
+    for value in values:
+        site, _, tier = value.partition("=")
+        if site not in CALL_SITES or tier not in TIER_ORDER:
+            raise click.BadParameter(f"expected SITE=TIER with SITE in {', '.join(CALL_SITES)} "
+                                     f"and TIER in {', '.join(TIER_ORDER)}, got '{value}'")
+        routes[site] = tier
+    return routes
+
+def parse_locale_option(ctx, param, value):
+    """Parse --locales, reporting an invalid language tag as a usage error"""
+    try:
+        return parse_locales(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+@click.group(invoke_without_command=True)
+@click.option('--output-format', '-f', type=click.Choice(OUTPUT_FORMATS), multiple=True, default=[DEFAULT_FORMAT],
+              help='Output format for the press kit; repeat to render several formats in one run')
+@click.option('--max-workers', '-w', type=click.IntRange(min=1), default=DEFAULT_MAX_WORKERS,
+              help='Maximum number of Gemini requests sent at the same time')
+@click.option('--no-cache', is_flag=True, default=False,
+              help='Always call Gemini and do not store responses')
+@click.option('--refresh', is_flag=True, default=False,
+              help='Ignore cached Gemini responses and replace them with fresh ones')
+@click.option('--cache-ttl', type=click.IntRange(min=1), default=DEFAULT_TTL,
+              help='Expire cached Gemini responses after this many seconds')
+@click.option('--cache-size', type=click.IntRange(min=1), default=DEFAULT_MAX_ENTRIES,
+              help='Maximum number of cached Gemini responses kept on disk')
+@click.option('--semantic-cache', is_flag=True, default=False,
+              help='Reuse sections generated earlier for near-identical company and press kit details')
+@click.option('--semantic-threshold', type=click.FloatRange(0, 1), default=DEFAULT_SEMANTIC_THRESHOLD,
+              help='Input similarity (0-1) from which --semantic-cache reuses a section')
+@click.option('--stream', is_flag=True, default=False,
+              help='Stream drafts as they are generated and report time to first token')
+@click.option('--profile', type=click.Path(dir_okay=False), default=None,
+              help='Record a trace of every LLM call, search, render and stage to this file '
+                   '(Chrome trace format for .json, JSON lines otherwise)')
+@click.option('--requests-per-minute', type=click.IntRange(min=0), default=DEFAULT_REQUESTS_PER_MINUTE,
+              help='Gemini request quota enforced on the client; 0 disables the limit')
+@click.option('--tokens-per-minute', type=click.IntRange(min=0), default=DEFAULT_TOKENS_PER_MINUTE,
+              help='Gemini prompt token quota enforced on the client')
+@click.option('--max-retries', type=click.IntRange(min=0), default=DEFAULT_MAX_RETRIES,
+              help='Retries with jittered exponential backoff for rate-limited or failed Gemini calls')
+@click.option('--hedge', is_flag=True, default=False,
+              help='Send a duplicate Gemini request when the first one exceeds the p95 latency')
+@click.option('--generation-mode', type=click.Choice(GENERATION_MODES), default=GENERATION_MODES[0],
+              help="'standard' sends one request per section; 'combined' requests every section in one call; "
+                   "'preview' drafts short style previews first and the full release only for the chosen style")
+@click.option('--revision-threshold', type=click.IntRange(min=0, max=10), default=DEFAULT_REVISION_THRESHOLD,
+              help='Sections whose average review score is below this are revised, along with the sections '
+                   'a typed change request names')
+@click.option('--revision-rounds', type=click.IntRange(min=0), default=DEFAULT_REVISION_ROUNDS,
+              help='Maximum revise-and-review rounds per modification request')
+@click.option('--review-policy', type=click.Choice(REVIEW_POLICIES), default=REVIEW_POLICIES[0],
+              help="'llm' reviews every section with Gemini; 'local' only scores sections locally; "
+                   "'auto' skips Gemini for sections whose local scores are clearly high or low")
+@click.option('--local-accept-above', type=click.FloatRange(0, 10), default=DEFAULT_ACCEPT_ABOVE,
+              help="With --review-policy auto, keep local scores whose average is at least this")
+@click.option('--local-reject-below', type=click.FloatRange(0, 10), default=DEFAULT_REJECT_BELOW,
+              help="With --review-policy auto, keep local scores whose average is below this")
+@click.option('--fast-model', default=DEFAULT_FAST_MODEL, show_default=True,
+              help='Gemini model of the fast tier used for short, low-stakes sections and as a fallback')
+@click.option('--route', 'routes', metavar='SITE=TIER', multiple=True, callback=parse_routes,
+              help=f"Route a call site ({', '.join(CALL_SITES)}) to a model tier ({', '.join(TIER_ORDER)}); "
+                   f"repeat for several sites")
+@click.option('--route-latency-budget', type=click.FloatRange(min=0, min_open=True), default=DEFAULT_LATENCY_BUDGET,
+              help='Fall back to a faster tier when a model\'s p95 latency for a call site exceeds this many seconds')
+@click.option('--locales', metavar='LOCALES', default=None, callback=parse_locale_option,
+              help='Also produce the kit in these languages, e.g. "de,fr,pt-BR"; the content is generated once and '
+                   'translated paragraph by paragraph through a translation memory')
+@click.option('--resume', metavar='RUN_ID', default=None,
+              help='Continue an earlier run, reusing every stage it completed')
+@click.pass_context
+def main(ctx, output_format, max_workers, no_cache, refresh, cache_ttl, cache_size, semantic_cache, semantic_threshold,
+         stream, profile, requests_per_minute, tokens_per_minute, max_retries, hedge, generation_mode,
+         revision_threshold, revision_rounds, review_policy, local_accept_above, local_reject_below, fast_model,
+         routes, route_latency_budget, locales, resume):
     """PressAgent: Automatic Press Kit Generation and Quality Review"""
+    configure_cache(enabled=not no_cache, refresh=refresh, max_entries=cache_size, ttl=cache_ttl,
+                    semantic=semantic_cache, semantic_threshold=semantic_threshold)
+    configure_scheduler(requests_per_minute, tokens_per_minute, max_retries, hedge)
+    configure_review_policy(review_policy, local_accept_above, local_reject_below)
+    configure_router({"fast": fast_model}, routes, route_latency_budget)
+    ctx.obj = {"output_formats": list(output_format), "max_workers": max_workers, "generation_mode": generation_mode,
+               "locales": locales, "resume": resume}
+    
+    if profile:
+        enable_tracing(profile)
+        ctx.call_on_close(finish_profile)
+    if semantic_cache and not no_cache:
+        ctx.call_on_close(display_semantic_cache_stats)
+    
+    # Subcommands such as `batch` run without the interactive flow
+    if ctx.invoked_subcommand is not None:
+        return
+    
+    journal = open_run_journal(resume)
     print("\nWelcome to PressAgent: Press Kit Generator\n")
+    print(f"Run ID: {journal.run_id}")
     
+    background = None
     try:
         # Step 1: Collect all necessary data
-        data = collect_all_data()
+        with span("stage:collect", "stage"):
+            data = journal.stage("data", collect_all_data)
         
-        # Step 2: Generate content
-        content = generate_all_content(data)
+        # Step 2: Generate content; style-independent sections start right away
+        # and keep generating until the configuration is confirmed
+        def keep_background(tasks):
+            nonlocal background
+            background = tasks
+        
+        # Each draft and section is also journaled as it finishes, so a resumed
+        # run only regenerates the ones that had not finished
+        sections_journal = journal.child("content")
+        with span("stage:generate", "stage"):
+            content = journal.stage("content", lambda: generate_all_content(data, max_workers, stream, generation_mode,
+                                                                            keep_background, sections_journal))
         
         # Step 3: Present final configuration
         print("\n[Final Configuration Confirmation]\n")
@@ -34,17 +160,49 @@ def main(output_format):
             print("Process cancelled by user.")
             return
         
+        if any(section not in content for section in STYLE_INDEPENDENT_SECTIONS):
+            if background is None:
+                # Resumed before these sections were saved
+                background = start_background_sections(data, max_workers, stream, journal=sections_journal)
+            with span("stage:await_sections", "stage"):
+                content.update(background.result())
+            journal.save("content", content)
+        
         # Step 4: Review the generated press kit
-        review_result = review_press_kit(content)
+        with span("stage:review", "stage"):
+            review_result = journal.stage("review", lambda: review_press_kit(content, max_workers, data=data))
         need_modifications = display_review_report(review_result)
         
         if need_modifications:
-            print("\nModification functionality would be implemented here in a complete solution.")
-            print("For now, we'll proceed with the current version.")
+            request = input("Describe any specific changes (leave blank to act on the review feedback): ").strip()
+            sections = None
+            if request and not requested_sections(request):
+                answer = input("Which sections should this apply to? "
+                               "(e.g. 'press release, email'; leave blank for all): ")
+                sections = requested_sections(answer) or list(REVIEW_SECTIONS)
+            with span("stage:revise", "stage"):
+                content, review_result = revise_press_kit(data, content, review_result, request, revision_threshold,
+                                                          revision_rounds, max_workers, sections)
+            journal.save("content", content)
+            journal.save("review", review_result)
+            display_review_report(review_result, ask=False)
         
         # Step 5: Save the final output
-        output_file = save_output(data, content, review_result, output_format)
-        print(f"\nPress kit generation complete! File saved at: {output_file}")
+        with span("stage:save", "stage"):
+            output_files = journal.stage("output", lambda: save_output(data, content, review_result,
+                                                                       list(output_format)))
+        
+        # Step 6: Translate the final content into the other locales
+        if locales:
+            with span("stage:localize", "stage"):
+                localized = journal.stage("localized", lambda: localize_content(content, locales, max_workers))
+            for locale, localized_content in localized.items():
+                output_files = output_files + save_output(data, localized_content, review_result,
+                                                          list(output_format), locale)
+        print(f"\nPress kit generation complete! Files saved at: {', '.join(output_files)}")
+        
+        if stream:
+            display_generation_metrics()
     
     except KeyboardInterrupt:
         print("\nProcess interrupted by user. Exiting...")
@@ -52,6 +210,108 @@ def main(output_format):
         print(f"\nAn error occurred: {str(e)}")
         import traceback
         traceback.print_exc()
+        print(f"\nCompleted stages were saved; continue with --resume {journal.run_id}")
+    finally:
+        # Stops background sections that are no longer wanted; a no-op once they are collected
+        if background is not None:
+            background.cancel()
+
+def open_run_journal(resume):
+    """Open the journal for this run, reporting an unknown --resume run id as a usage error"""
+    try:
+        return open_journal(resume)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--resume'")
+
+def display_semantic_cache_stats():
+    """Print how many sections the semantic cache served"""
+    cache = get_semantic_cache()
+    if cache is not None:
+        cache.display_stats()
+
+def finish_profile():
+    """Write the trace file and print the profile summary"""
+    trace_path = write_trace()
+    display_trace_summary()
+    display_router_health()
+    print(f"\nTrace saved at: {trace_path}")
+
+@main.command()
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--results', '-r', type=click.Path(dir_okay=False), default='output/batch_results.jsonl',
+              help='JSONL file that receives one status line per manifest record')
+@click.option('--workers', '-j', type=click.IntRange(min=1), default=DEFAULT_BATCH_WORKERS,
+              help='Number of press kits generated at the same time')
+@click.option('--reuse-kits', is_flag=True,
+              help='Serve kits already in the artifact store for identical records instead of regenerating them')
+@click.pass_obj
+def batch(settings, manifest, results, workers, reuse_kits):
+    """Generate press kits for every record in a JSONL or CSV manifest"""
+    records = load_manifest(manifest)
+    print(f"\n[Batch Mode] {len(records)} records from {manifest}, {workers} workers\n")
+    
+    journal = open_run_journal(settings["resume"])
+    print(f"Run ID: {journal.run_id}")
+    summary = run_batch(records, results, workers=workers, max_workers=settings["max_workers"],
+                        default_formats=settings["output_formats"], mode=settings["generation_mode"],
+                        journal=journal, reuse=reuse_kits, default_locales=settings["locales"])
+    
+    print(f"\nBatch complete: {summary['succeeded']} succeeded, {summary['failed']} failed. "
+          f"Results saved at: {results}")
+    if summary["failed"]:
+        raise SystemExit(1)
+
+@main.command()
+@click.option('--host', default=DEFAULT_HOST, show_default=True, help='Interface the service listens on')
+@click.option('--port', type=click.IntRange(min=0, max=65535), default=DEFAULT_PORT, show_default=True,
+              help='Port the service listens on')
+@click.option('--workers', '-j', type=click.IntRange(min=1), default=DEFAULT_BATCH_WORKERS,
+              help='Number of press kits generated at the same time')
+@click.option('--queue-size', type=click.IntRange(min=1), default=DEFAULT_QUEUE_SIZE,
+              help='Jobs allowed to wait for a worker before new submissions are rejected with 429')
+@click.pass_obj
+def serve(settings, host, port, workers, queue_size):
+    """Run a local HTTP/JSON service that queues and generates press kits"""
+    server = create_server(host, port, workers, queue_size, max_workers=settings["max_workers"],
+                           default_formats=settings["output_formats"], mode=settings["generation_mode"],
+                           default_locales=settings["locales"])
+    print(f"\n[Service] Listening on http://{host}:{server.server_address[1]} "
+          f"({workers} workers, queue of {queue_size})\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Service] Shutting down...")
+    finally:
+        server.server_close()
+
+@main.command()
+@click.option('--company', default=None, help='Only kits for this company name')
+@click.option('--topic', default=None, help='Only kits on this topic')
+@click.option('--style', type=click.Choice(STYLE_OPTIONS, case_sensitive=False), default=None,
+              help='Only kits written in this style')
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default=None,
+              help='Only kits saved in this format')
+@click.option('--locale', default=None, help='Only kits translated into this locale')
+@click.option('--limit', '-n', type=click.IntRange(min=1), default=20, show_default=True,
+              help='Number of kits listed, newest first')
+def kits(company, topic, style, output_format, locale, limit):
+    """List press kits kept in the artifact store"""
+    if style is not None:
+        style = next(s for s in STYLE_OPTIONS if s.lower() == style.lower())
+    found = get_store().find_kits(company, topic, style, output_format, limit, locale)
+    if not found:
+        print("No stored press kits match.")
+        return
+    
+    for kit in found:
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(kit["created_at"]))
+        scores = ", ".join(f"{key}={value}" for key, value in kit["scores"].items())
+        print(f"{kit['kit_id']}  {created}  {kit['company']} / {kit['topic']} / {kit['style'] or '-'}"
+              + (f" [{kit['locale']}]" if kit["locale"] else ""))
+        if scores:
+            print(f"    scores: {scores}")
+        for fmt, path in kit["files"].items():
+            print(f"    {fmt}: {path}")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,16 +1,112 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL, STYLE_OPTIONS
+import re
+import threading
+from config import STYLE_OPTIONS
+from parallel import run_parallel, BackgroundTasks, CallLimit, DEFAULT_MAX_WORKERS
+from gemini_client import generate_text
+from quality_reviewer import REVIEW_SECTIONS
+from output_formatter import open_draft_stream
+from response_cache import get_semantic_cache, is_refresh_requested
+from tracing import span
 
-# Configure the Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# "standard" sends one request per section; "combined" asks for every section in one structured request;
+# "preview" generates short, token-capped previews for every style and a full draft only for the chosen one
+GENERATION_MODES = ["standard", "combined", "preview"]
 
-def get_gemini_model():
-    """Get the Gemini model instance"""
-    return genai.GenerativeModel(GEMINI_MODEL)
+# Output token cap for the opening paragraph generated in preview mode
+PREVIEW_MAX_TOKENS = 160
 
-def generate_press_release(data, style="professional"):
-    """Generate press release draft using Gemini"""
-    model = get_gemini_model()
+# Sections that do not depend on the chosen press release style
+STYLE_INDEPENDENT_SECTIONS = ["company_overview", "pr_message", "email_draft"]
+
+# Keeps streamed previews from different drafts from interleaving
+_print_lock = threading.Lock()
+
+class SectionCancelled(Exception):
+    """Raised inside a streamed section whose result is no longer wanted"""
+
+class SectionStream:
+    """Receive streamed chunks for one section, write them to a draft file and report the first paragraph"""
+    
+    def __init__(self, data, section, on_first_paragraph=None, cancelled=None):
+        self.file = open_draft_stream(data, section)
+        self.on_first_paragraph = on_first_paragraph
+        self.cancelled = cancelled
+        self.text = ""
+        self._reported = False
+    
+    def __call__(self, chunk):
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise SectionCancelled(self.file.name)
+        
+        self.file.write(chunk)
+        self.file.flush()
+        self.text += chunk
+        
+        if not self._reported and '\n\n' in self.text.lstrip():
+            self._reported = True
+            if self.on_first_paragraph:
+                self.on_first_paragraph(self.text.lstrip().split('\n\n')[0])
+    
+    def close(self):
+        self.file.close()
+
+def _checkpoint(journal, name, compute):
+    """Return the section `name` saved in `journal`, or compute it and save it there"""
+    if journal is None:
+        return compute()
+    return journal.stage(name, compute)
+
+def _print_preview(style, paragraph):
+    """Print a draft preview as soon as its first paragraph has streamed in"""
+    with _print_lock:
+        print(f"\n[Draft Preview – Style: {style.capitalize()}]\n{paragraph}\n")
+
+def generate_section(generator, data, section, stream=False, on_first_paragraph=None, cancelled=None, **kwargs):
+    """Run a section generator, streaming its chunks into a draft file when `stream` is set
+    
+    A section whose `cancelled` event is already set is not sent at all, and
+    a streamed section stops at its next chunk once the event is set.
+    """
+    if cancelled is not None and cancelled.is_set():
+        raise SectionCancelled(section)
+    if not stream:
+        return generator(data, **kwargs)
+    
+    section_stream = SectionStream(data, section, on_first_paragraph, cancelled)
+    try:
+        return generator(data, on_chunk=section_stream, **kwargs)
+    finally:
+        section_stream.close()
+
+def _semantic_generate(section, data, generate, on_chunk=None, style=None):
+    """Reuse a section generated earlier for near-identical inputs when the semantic cache is enabled"""
+    cache = get_semantic_cache()
+    if cache is None:
+        return generate()
+    
+    from semantic_cache import kit_fields
+    fields = kit_fields(section, data, style)
+    if not is_refresh_requested():
+        with span(f"semantic:{section}", "cache") as attrs:
+            text, attrs["similarity"] = cache.lookup(section, fields)
+            attrs["hit"] = text is not None
+        if text is not None:
+            if on_chunk is not None:
+                on_chunk(text)
+            return text
+    
+    text = generate()
+    cache.store(section, fields, text)
+    return text
+
+def generate_press_release(data, style="professional", on_chunk=None, opening=None):
+    """Generate press release draft using Gemini, optionally continuing from an approved opening paragraph"""
+    opening_instruction = ""
+    if opening:
+        opening_instruction = f"""
+    
+    Begin the press release with this opening paragraph and keep its tone and voice throughout:
+    {opening}"""
     
     prompt = f"""
     Generate a press release for {data['company_info']['name']} about {data['press_kit_info']['topic']}.
@@ -26,17 +122,51 @@ def generate_press_release(data, style="professional"):
     Style: {style}
     
     Include any relevant supplementary data:
-    {[item['title'] for item in data['supplementary_data']]}
+    {[item['title'] for item in data['supplementary_data']]}{opening_instruction}
     """
     
-    response = model.generate_content(prompt)
+    if opening:
+        # A release continuing an approved opening is specific to that opening
+        return generate_text(prompt, section=f"press_release:{style}", on_chunk=on_chunk)
+    return _semantic_generate("press_release", data,
+                              lambda: generate_text(prompt, section=f"press_release:{style}", on_chunk=on_chunk),
+                              on_chunk, style)
+
+def generate_style_preview(data, style="professional", on_chunk=None):
+    """Generate only the opening paragraph of a press release in the given style"""
+    prompt = f"""
+    Write only the opening paragraph (headline and lead) of a press release for {data['company_info']['name']} about {data['press_kit_info']['topic']}.
+    
+    Product/Service: {data['company_info']['product']}
+    Brand Attributes: {data['company_info']['brand_attributes']}
+    Target Media: {data['press_kit_info']['target_media']}
+    Desired Tone: {data['press_kit_info']['tone']}
+    Style: {style}
     
-    return response.text
+    Keep it under 80 words and do not write the rest of the release.
+    """
+    
+    return generate_text(prompt, generation_config={"max_output_tokens": PREVIEW_MAX_TOKENS},
+                         section=f"preview:{style}", on_chunk=on_chunk)
 
-def generate_company_overview(data):
-    """Generate company overview using Gemini"""
-    model = get_gemini_model()
+def generate_style_previews(data, max_workers=DEFAULT_MAX_WORKERS, limit=None, journal=None):
+    """Generate short previews for every style concurrently; full drafts are left for the chosen style"""
+    for style in STYLE_OPTIONS:
+        print(f"\nGenerating {style} preview...")
+    
+    previews = run_parallel({
+        style: (lambda style=style: _checkpoint(journal, f"preview_{style}",
+                                                lambda: generate_style_preview(data, style)))
+        for style in STYLE_OPTIONS
+    }, max_workers=max_workers, limit=limit)
     
+    return {
+        style: {"full_text": None, "preview": preview.strip()}
+        for style, preview in previews.items()
+    }
+
+def generate_company_overview(data, on_chunk=None):
+    """Generate company overview using Gemini"""
     prompt = f"""
     Write a comprehensive company overview for {data['company_info']['name']}.
     
@@ -48,14 +178,11 @@ def generate_company_overview(data):
     Make it professional and informative, suitable for a press kit.
     """
     
-    response = model.generate_content(prompt)
-    
-    return response.text
+    return _semantic_generate("company_overview", data,
+                              lambda: generate_text(prompt, section="company_overview", on_chunk=on_chunk), on_chunk)
 
-def generate_pr_message(data):
+def generate_pr_message(data, on_chunk=None):
     """Generate PR message using Gemini"""
-    model = get_gemini_model()
-    
     prompt = f"""
     Write a concise PR message for {data['company_info']['name']} regarding {data['press_kit_info']['topic']}.
     
@@ -64,14 +191,11 @@ def generate_pr_message(data):
     Keep it brief but impactful.
     """
     
-    response = model.generate_content(prompt)
-    
-    return response.text
+    return _semantic_generate("pr_message", data,
+                              lambda: generate_text(prompt, section="pr_message", on_chunk=on_chunk), on_chunk)
 
-def generate_email_draft(data):
+def generate_email_draft(data, on_chunk=None):
     """Generate email draft using Gemini"""
-    model = get_gemini_model()
-    
     prompt = f"""
     Write an email draft that could be sent to media contacts about {data['press_kit_info']['topic']} for {data['company_info']['name']}.
     
@@ -81,26 +205,193 @@ def generate_email_draft(data):
     Include a brief introduction, the key points about the announcement, and contact information placeholder.
     """
     
-    response = model.generate_content(prompt)
+    return _semantic_generate("email_draft", data,
+                              lambda: generate_text(prompt, section="email_draft", on_chunk=on_chunk), on_chunk)
+
+def revise_section(data, section, text, instructions, generation_config=None):
+    """Revise one section according to reviewer feedback or a user request, keeping what works"""
+    name = REVIEW_SECTIONS[section]
+    prompt = f"""
+    Revise the following {name} for {data['company_info']['name']} about {data['press_kit_info']['topic']}.
     
-    return response.text
+    Target Media: {data['press_kit_info']['target_media']}
+    Desired Tone: {data['press_kit_info']['tone']}
+    
+    Apply these changes and keep everything else as it is:
+    {instructions}
+    
+    Return only the revised {name}.
+    
+    {name.upper()}:
+    {text}
+    """
+    
+    return generate_text(prompt, generation_config=generation_config, section=f"revision:{section}")
 
-def generate_style_options(data):
-    """Generate multiple style options for press release"""
-    style_drafts = {}
+def revise_style_drafts(data, style_drafts, request, max_workers=DEFAULT_MAX_WORKERS, limit=None):
+    """Apply a modification request to the existing style drafts instead of writing new ones"""
+    print("\nRevising the drafts...")
+    
+    def revise(draft):
+        if draft["full_text"] is None:
+            # Preview mode: only the opening paragraph exists so far
+            preview = revise_section(data, "press_release", draft["preview"], request,
+                                     generation_config={"max_output_tokens": PREVIEW_MAX_TOKENS})
+            return {"full_text": None, "preview": preview.strip()}
+        full_text = revise_section(data, "press_release", draft["full_text"], request)
+        return {"full_text": full_text, "preview": _draft_preview(full_text)}
+    
+    return run_parallel({
+        style: (lambda draft=draft: revise(draft)) for style, draft in style_drafts.items()
+    }, max_workers=max_workers, limit=limit)
+
+def _section_marker(key):
+    """Marker line that introduces a section in a combined response"""
+    return f"=== {re.sub(r'[^A-Za-z0-9]+', '_', key).strip('_').upper()} ==="
+
+def generate_combined_sections(data, styles=STYLE_OPTIONS, on_chunk=None):
+    """Generate press releases for `styles` and the other sections in a single Gemini call
+    
+    The shared company and media context is sent once instead of once per
+    section. Returns a dict keyed by "press_release:<style>",
+    "company_overview", "pr_message" and "email_draft"; sections missing
+    from the response are left out, and so is the last section when the
+    response stopped at the output token cap.
+    """
+    instructions = {f"press_release:{style}": f"A press release about the topic, written in a {style} style." for style in styles}
+    instructions.update({
+        "company_overview": "A comprehensive company overview covering the flagship product/service, major achievements and brand attributes. Make it professional and informative, suitable for a press kit.",
+        "pr_message": "A concise PR message about the topic for the target media in the desired tone. Keep it brief but impactful.",
+        "email_draft": "An email draft that could be sent to media contacts about the topic, with a brief introduction, the key points about the announcement, and a contact information placeholder."
+    })
+    section_list = "\n".join(f"    {_section_marker(key)}\n    {instruction}" for key, instruction in instructions.items())
     
-    for style in STYLE_OPTIONS:
-        print(f"\nGenerating {style} draft...")
-        draft = generate_press_release(data, style)
-        preview = draft.split('\n\n')[0] if '\n\n' in draft else draft[:200] + "..."
-        
+    prompt = f"""
+    Prepare press kit content for {data['company_info']['name']} about {data['press_kit_info']['topic']}.
+    
+    Company Information:
+    - Name: {data['company_info']['name']}
+    - Product/Service: {data['company_info']['product']}
+    - Achievements: {data['company_info']['achievements']}
+    - Brand Attributes: {data['company_info']['brand_attributes']}
+    
+    Target Media: {data['press_kit_info']['target_media']}
+    Desired Tone: {data['press_kit_info']['tone']}
+    
+    Include any relevant supplementary data in the press releases:
+    {[item['title'] for item in data['supplementary_data']]}
+    
+    Write every section below. Start each section with its marker line exactly as shown, on a line of its own, and write nothing outside the sections.
+
+{section_list}
+    """
+    
+    stats = {}
+    response = generate_text(prompt, section="combined", on_chunk=on_chunk, call_stats=stats)
+    
+    markers = {_section_marker(key): key for key in instructions}
+    sections = {}
+    current = last = None
+    lines = []
+    # Only the exact marker lines switch sections; anything else, such as a
+    # Markdown "=====" heading underline, is part of the current section
+    for line in response.split('\n') + [None]:
+        marker = line.strip() if line is not None else None
+        if line is None or marker in markers:
+            if current is not None and '\n'.join(lines).strip():
+                sections[current] = '\n'.join(lines).strip()
+                last = current
+            current = markers.get(marker)
+            lines = []
+        elif current is not None:
+            lines.append(line)
+    
+    if stats.get("finish_reason") == "MAX_TOKENS" and last is not None:
+        # Cut off mid-section; _complete_combined_sections generates it on its own
+        sections.pop(last)
+    
+    return sections
+
+def _complete_combined_sections(data, styles, max_workers, stream, journal=None):
+    """Generate sections in combined mode, falling back to single-section calls for any the response missed"""
+    def combined():
+        if not stream:
+            return generate_combined_sections(data, styles)
+        section_stream = SectionStream(data, "combined")
+        try:
+            return generate_combined_sections(data, styles, on_chunk=section_stream)
+        finally:
+            section_stream.close()
+    
+    sections = dict(_checkpoint(journal, "combined", combined))
+    
+    fallbacks = {f"press_release:{style}": (lambda style=style: generate_press_release(data, style)) for style in styles}
+    fallbacks.update({
+        "company_overview": lambda: generate_company_overview(data),
+        "pr_message": lambda: generate_pr_message(data),
+        "email_draft": lambda: generate_email_draft(data)
+    })
+    missing = {
+        key: (lambda key=key, task=task: _checkpoint(journal, key, task))
+        for key, task in fallbacks.items() if key not in sections
+    }
+    if missing:
+        print(f"\nCombined response missed {len(missing)} sections; generating them separately...")
+        sections.update(run_parallel(missing, max_workers=max_workers))
+    
+    return sections
+
+def _draft_preview(draft):
+    """The first paragraph of a draft, used as its preview"""
+    return draft.split('\n\n')[0] if '\n\n' in draft else draft[:200] + "..."
+
+def _build_style_drafts(drafts):
+    """Attach a preview (the first paragraph) to each full draft"""
+    style_drafts = {}
+    for style, draft in drafts.items():
         style_drafts[style] = {
             "full_text": draft,
-            "preview": preview
+            "preview": _draft_preview(draft)
         }
     
     return style_drafts
 
+def generate_style_options(data, max_workers=DEFAULT_MAX_WORKERS, stream=False, limit=None, journal=None):
+    """Generate multiple style options for press release; `limit` is a CallLimit shared with other work"""
+    for style in STYLE_OPTIONS:
+        print(f"\nGenerating {style} draft...")
+    
+    drafts = run_parallel({
+        style: (lambda style=style: _checkpoint(journal, f"press_release_{style}", lambda: generate_section(
+            generate_press_release, data, f"press_release_{style}", stream,
+            on_first_paragraph=lambda paragraph: _print_preview(style, paragraph), style=style
+        )))
+        for style in STYLE_OPTIONS
+    }, max_workers=max_workers, limit=limit)
+    
+    return _build_style_drafts(drafts)
+
+def start_background_sections(data, max_workers=DEFAULT_MAX_WORKERS, stream=False, limit=None, journal=None):
+    """Start the style-independent sections in the background while the user picks a style
+    
+    Collect them with `.result()` once they are needed, or call `.cancel()`
+    if the press kit is abandoned. The sections run within `max_workers`,
+    or within a CallLimit `limit` shared with other work. With a `journal`,
+    each finished section is saved to it and sections already saved are reused.
+    """
+    generators = {
+        "company_overview": generate_company_overview,
+        "pr_message": generate_pr_message,
+        "email_draft": generate_email_draft
+    }
+    cancelled = threading.Event()
+    return BackgroundTasks({
+        section: (lambda section=section: _checkpoint(journal, section, lambda: generate_section(
+            generators[section], data, section, stream, cancelled=cancelled
+        )))
+        for section in STYLE_INDEPENDENT_SECTIONS
+    }, max_workers=max_workers, cancelled=cancelled, limit=limit)
+
 def present_style_options(style_drafts):
     """Present style options to user and get selection"""
     print("\n[Draft Previews]\n")
@@ -124,30 +415,112 @@ def present_style_options(style_drafts):
     print("Invalid selection. Please try again.")
     return present_style_options(style_drafts)
 
-def generate_all_content(data):
-    """Generate all content for the press kit"""
+def generate_content_for_style(data, style, max_workers=DEFAULT_MAX_WORKERS, mode="standard", journal=None):
+    """Generate all content for a known style without asking the user
+    
+    With a `journal`, each finished section is saved to it, so a failed run
+    resumes without regenerating the sections it already has.
+    """
+    if mode == "combined":
+        sections = _complete_combined_sections(data, [style], max_workers, False, journal)
+        return {
+            "press_release": sections[f"press_release:{style}"],
+            "company_overview": sections["company_overview"],
+            "pr_message": sections["pr_message"],
+            "email_draft": sections["email_draft"],
+            "selected_style": style
+        }
+    
+    generators = {
+        "press_release": lambda: generate_press_release(data, style),
+        "company_overview": lambda: generate_company_overview(data),
+        "pr_message": lambda: generate_pr_message(data),
+        "email_draft": lambda: generate_email_draft(data)
+    }
+    sections = run_parallel({
+        section: (lambda section=section: _checkpoint(journal, section, generators[section])) for section in generators
+    }, max_workers=max_workers)
+    
+    content = dict(sections)
+    content["selected_style"] = style
+    
+    return content
+
+def generate_all_content(data, max_workers=DEFAULT_MAX_WORKERS, stream=False, mode="standard", on_background=None,
+                         journal=None):
+    """Generate all content for the press kit
+    
+    The style-independent sections are generated while the user is choosing
+    a style. When the caller passes `on_background`, the started sections
+    are handed to it and left out of the result, so the caller can collect
+    or cancel them later; otherwise they are awaited here. With a `journal`,
+    drafts and sections are saved to it as each one finishes and reused on
+    a resumed run.
+    """
+    own_background = on_background is None and mode != "combined"
+    background = None
+    # Style drafts and background sections share one limit, so --max-workers bounds both
+    limit = CallLimit(max_workers)
+    
+    def style_options():
+        if mode == "combined":
+            print("\nGenerating all sections in one request...")
+            combined = _complete_combined_sections(data, STYLE_OPTIONS, max_workers, stream, journal)
+            return combined, _build_style_drafts({style: combined[f"press_release:{style}"] for style in STYLE_OPTIONS})
+        if mode == "preview":
+            return None, generate_style_previews(data, max_workers, limit, journal)
+        return None, generate_style_options(data, max_workers, stream, limit, journal)
+    
     # Generate and present style options for press release
-    style_drafts = generate_style_options(data)
-    selected_style, press_release = present_style_options(style_drafts)
-    
-    if selected_style == "request_modification":
-        # Handle modification request
-        print(f"Applying requested modifications: {press_release}")
-        # In a real implementation, you would modify the draft based on the request
-        style_drafts = generate_style_options(data)
+    try:
+        # The drafts' slots are reserved before the background sections start,
+        # so the sections only use the slots left over and never delay the menu
+        with limit.reserve(len(STYLE_OPTIONS)):
+            if mode != "combined":
+                background = start_background_sections(data, max_workers, stream, limit, journal)
+                if on_background is not None:
+                    on_background(background)
+            combined, style_drafts = style_options()
         selected_style, press_release = present_style_options(style_drafts)
+        
+        if selected_style == "request_modification":
+            # Revise the drafts the user has already seen rather than starting over
+            print(f"Applying requested modifications: {press_release}")
+            style_drafts = revise_style_drafts(data, style_drafts, press_release, max_workers, limit)
+            selected_style, press_release = present_style_options(style_drafts)
+    except BaseException:
+        if own_background and background is not None:
+            background.cancel()
+        raise
+    
+    if combined is not None:
+        return {
+            "press_release": press_release,
+            "company_overview": combined["company_overview"],
+            "pr_message": combined["pr_message"],
+            "email_draft": combined["email_draft"],
+            "selected_style": selected_style
+        }
     
-    # Generate other content
-    company_overview = generate_company_overview(data)
-    pr_message = generate_pr_message(data)
-    email_draft = generate_email_draft(data)
-    
-    content = {
-        "press_release": press_release,
-        "company_overview": company_overview,
-        "pr_message": pr_message,
-        "email_draft": email_draft,
-        "selected_style": selected_style
-    }
+    if press_release is None:
+        # Preview mode: write the full release for the chosen style, seeded with its preview
+        print(f"\nGenerating full {selected_style} draft...")
+        try:
+            with limit.slot():
+                press_release = _checkpoint(journal, f"press_release_{selected_style}", lambda: generate_section(
+                    generate_press_release, data, f"press_release_{selected_style}", stream,
+                    style=selected_style, opening=style_drafts[selected_style]["preview"]
+                ))
+        except BaseException:
+            if own_background:
+                background.cancel()
+            raise
+    
+    content = {"press_release": press_release}
+    
+    # The other sections were started before the style choice; none of them depend on it
+    if own_background:
+        content.update(background.result())
+    content["selected_style"] = selected_style
     
     return content
\ No newline at end of file
@@ -1,7 +1,27 @@
 import json
-import requests
-from serpapi import GoogleSearch
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config import SERPAPI_API_KEY
+from response_cache import get_cache, make_cache_key, is_refresh_requested
+from tracing import span
+
+# Search results older than this are fetched again
+SEARCH_CACHE_TTL = 6 * 60 * 60
+
+# serpapi (and requests with it) is imported by the first search; benchmark.py sets an offline stand-in
+GoogleSearch = None
+
+# News results fetched per search; ranking picks the best few from these
+SEARCH_CANDIDATES = 20
+
+# Point SerpAPI requests at another server, e.g. a local fake for tests
+SERPAPI_BACKEND = os.getenv("SERPAPI_BACKEND")
+
+# Searches started in the background while the user is still answering prompts
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="serpapi-prefetch")
+_prefetched = {}
+_prefetched_lock = threading.Lock()
 
 def collect_company_info():
     """Collect company information from user input"""
@@ -25,10 +45,16 @@ def collect_company_info():
     
     return company_info
 
-def collect_press_kit_topic():
+def collect_press_kit_topic(company_name=None, product=""):
     """Collect press kit topic and preferences"""
+    topic = input("Press Kit Topic: ")
+    
+    # The search only needs the company, product and topic, so it can run while the remaining prompts are answered
+    if company_name:
+        prefetch_supplementary_data(company_name, topic, product)
+    
     press_kit_info = {
-        "topic": input("Press Kit Topic: "),
+        "topic": topic,
         "target_media": input("Target Media: "),
         "tone": input("Tone (e.g., professional, formal, creative): ")
     }
@@ -41,36 +67,91 @@ def collect_press_kit_topic():
     confirmation = input("\nIs the above information correct? (Y/N): ")
     if confirmation.upper() != 'Y':
         print("Please re-enter the information.")
-        return collect_press_kit_topic()
+        return collect_press_kit_topic(company_name, product)
     
     return press_kit_info
 
-def search_supplementary_data(company_name, topic):
-    """Search for supplementary data using SerpAPI"""
-    print("\n[Supplementary Data Collection]\n")
-    
-    print(f"Searching for latest news about {company_name} and {topic}...")
+def _google_search_class():
+    """The SerpAPI search class, imported on first use"""
+    global GoogleSearch
+    if GoogleSearch is None:
+        from serpapi import GoogleSearch as serpapi_search
+        GoogleSearch = serpapi_search
+    return GoogleSearch
+
+def run_search(params):
+    """Run a SerpAPI search, serving repeated queries from the on-disk cache"""
+    cache = get_cache("search", ttl=SEARCH_CACHE_TTL)
+    # The API key is deliberately not part of the key
+    key = make_cache_key(params.get("engine"), params.get("q"), params.get("num"))
     
+    with span(f"search:{params.get('engine')}", "search", query=params.get("q"), retries=0) as attrs:
+        attrs["cache"] = "disabled" if cache is None else "miss"
+        if cache is not None and not is_refresh_requested():
+            cached = cache.get(key)
+            if cached is not None:
+                attrs["cache"] = "hit"
+                return json.loads(cached)
+        
+        search = _google_search_class()(params)
+        if SERPAPI_BACKEND:
+            search.BACKEND = SERPAPI_BACKEND.rstrip("/")
+        results = search.get_dict()
+        
+        # Errors (quota, bad key) are not cached so the next run retries them
+        if cache is not None and "error" not in results:
+            cache.set(key, json.dumps(results))
+        
+        return results
+
+def prefetch_supplementary_data(company_name, topic, product=""):
+    """Start fetching supplementary data in the background"""
+    key = (company_name, topic, product)
+    with _prefetched_lock:
+        if key not in _prefetched:
+            _prefetched[key] = _prefetch_executor.submit(fetch_supplementary_data, company_name, topic, product)
+        return _prefetched[key]
+
+def fetch_supplementary_data(company_name, topic, product=""):
+    """Fetch supplementary news items from SerpAPI without prompting the user; empty when nothing was found"""
     # Use SerpAPI to search for news
     params = {
         "engine": "google_news",
         "q": f"{company_name} {topic}",
         "api_key": SERPAPI_API_KEY,
-        "num": 3  # Limit to 3 results
+        "num": SEARCH_CANDIDATES  # Candidates for ranking, not all of them are kept
     }
     
-    search = GoogleSearch(params)
-    results = search.get_dict()
+    results = run_search(params)
     
     supplementary_data = []
     if "news_results" in results and results["news_results"]:
-        for item in results["news_results"][:2]:  # Take only first 2 results
+        # Keep the most relevant distinct stories rather than the first results; NumPy loads here
+        from news_ranking import rank_news
+        for item in rank_news(results["news_results"], f"{company_name} {product} {topic}"):
             supplementary_data.append({
                 "title": item["title"],
                 "source": item["source"]
             })
     
-    # If no results found or error occurred, use dummy data
+    return supplementary_data
+
+def search_supplementary_data(company_name, topic, product=""):
+    """Search for supplementary data using SerpAPI"""
+    print("\n[Supplementary Data Collection]\n")
+    
+    print(f"Searching for latest news about {company_name} and {topic}...")
+    
+    with _prefetched_lock:
+        prefetched = _prefetched.pop((company_name, topic, product), None)
+    
+    if prefetched is not None:
+        supplementary_data = prefetched.result()
+    else:
+        supplementary_data = fetch_supplementary_data(company_name, topic, product)
+    
+    # If no results found or error occurred, use dummy data; the user decides
+    # below whether to keep it, so batch and service runs never get it
     if not supplementary_data:
         supplementary_data = [
             {
@@ -96,8 +177,9 @@ def search_supplementary_data(company_name, topic):
 def collect_all_data():
     """Main function to collect all required data"""
     company_info = collect_company_info()
-    press_kit_info = collect_press_kit_topic()
-    supplementary_data = search_supplementary_data(company_info["name"], press_kit_info["topic"])
+    press_kit_info = collect_press_kit_topic(company_info["name"], company_info["product"])
+    supplementary_data = search_supplementary_data(company_info["name"], press_kit_info["topic"],
+                                                   company_info["product"])
     
     # Combine all data
     all_data = {
@@ -107,3 +189,16 @@ def collect_all_data():
     }
     
     return all_data
+
+def build_data(company_info, press_kit_info, include_supplementary=True):
+    """Assemble the same data structure as collect_all_data without any prompts"""
+    supplementary_data = []
+    if include_supplementary:
+        supplementary_data = fetch_supplementary_data(company_info["name"], press_kit_info["topic"],
+                                                      company_info["product"])
+    
+    return {
+        "company_info": company_info,
+        "press_kit_info": press_kit_info,
+        "supplementary_data": supplementary_data
+    }
\ No newline at end of file
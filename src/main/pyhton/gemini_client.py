@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+from collections import deque
+from config import GEMINI_API_KEY, GEMINI_MODEL
+from response_cache import cached_generate_content
+from tracing import span, estimate_tokens, take_queue_time
+from call_scheduler import get_scheduler, retryable_errors, PartialResponseError
+from model_router import get_router
+
+# Shared, process-wide Gemini state. The SDK is imported on first use, since
+# importing it costs more than the rest of start-up. genai.configure() drops every client it
+# has built, so it must run exactly once; the generative service client (and
+# with it the gRPC channel and its keep-alive connections) is then created
+# once and reused by every model instance and worker thread.
+_registry_lock = threading.Lock()
+_configured = False
+_models = {}
+
+# Per-call timings for the most recent generate_text calls in this process
+MAX_RECORDED_METRICS = 10000
+_metrics_lock = threading.Lock()
+_generation_metrics = deque(maxlen=MAX_RECORDED_METRICS)
+
+def configure_gemini():
+    """Configure the Gemini SDK and open the shared transport once per process"""
+    global _configured
+    with _registry_lock:
+        if not _configured:
+            import google.generativeai as genai
+            from google.generativeai import client as genai_client
+            genai.configure(api_key=GEMINI_API_KEY)
+            genai_client.get_default_generative_client()
+            _configured = True
+
+def get_gemini_model(model_name=GEMINI_MODEL, generation_config=None):
+    """Get the shared Gemini model instance for a model name and generation settings"""
+    configure_gemini()
+    import google.generativeai as genai
+    key = (model_name, json.dumps(generation_config or {}, sort_keys=True))
+    
+    with _registry_lock:
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            _models[key] = model
+        return model
+
+def _generate_with_model(prompt, model_name, generation_config, section, on_chunk, fallback):
+    """Run one generate_text call against a specific model; returns the text and the call stats"""
+    model = get_gemini_model(model_name, generation_config)
+    started = time.perf_counter()
+    first_chunk_at = []
+    
+    def handle_chunk(chunk):
+        if not first_chunk_at:
+            first_chunk_at.append(time.perf_counter())
+        on_chunk(chunk)
+    
+    with span(section or "unnamed", "llm", model=model_name, queue_time=take_queue_time(), retries=0,
+              fallback=fallback) as attrs:
+        stats = {}
+        text = cached_generate_content(model, prompt, on_chunk=handle_chunk if on_chunk else None, stats=stats,
+                                       scheduler=get_scheduler(), tokens=estimate_tokens(prompt))
+        attrs["cache"] = stats["cache"]
+        attrs["retries"] = stats.get("retries", 0)
+        attrs["rate_limit_wait"] = stats.get("rate_limit_wait", 0.0)
+        attrs["hedged"] = stats.get("hedged", False)
+        attrs["prompt_tokens"] = stats.get("prompt_tokens") or estimate_tokens(prompt)
+        attrs["response_tokens"] = stats.get("response_tokens") or estimate_tokens(text)
+        attrs["tokens_estimated"] = "prompt_tokens" not in stats
+        if first_chunk_at:
+            attrs["time_to_first_token"] = first_chunk_at[0] - started
+    
+    finished = time.perf_counter()
+    stats["latency"] = finished - started - stats.get("rate_limit_wait", 0.0)
+    with _metrics_lock:
+        _generation_metrics.append({
+            "section": section or "unnamed",
+            "model": model_name,
+            "streamed": on_chunk is not None,
+            "time_to_first_token": first_chunk_at[0] - started if first_chunk_at else None,
+            "total_time": finished - started
+        })
+    
+    return text, stats
+
+def generate_text(prompt, model_name=None, generation_config=None, section=None, on_chunk=None, call_stats=None):
+    """Generate text for a prompt through the shared model registry and response cache
+    
+    Passing `on_chunk` streams the response: it is called with each piece of
+    text as soon as it arrives. Time to first token (streaming only) and total
+    generation time are recorded under `section`. Without a `model_name`, the
+    model is chosen by the router from the section's call site, falling back
+    to a faster tier when the chosen model is slow, failing or over quota.
+    A `call_stats` dict receives the stats of the call that answered, such
+    as its finish reason. An exception raised by `on_chunk`, such as a
+    cancelled section, is passed on without counting against the model.
+    """
+    call_stats = {} if call_stats is None else call_stats
+    if model_name is not None:
+        text, stats = _generate_with_model(prompt, model_name, generation_config, section, on_chunk, False)
+        call_stats.update(stats)
+        return text
+    
+    router = get_router()
+    candidates = router.candidates(section)
+    for index, candidate in enumerate(candidates):
+        try:
+            text, stats = _generate_with_model(prompt, candidate, generation_config, section, on_chunk, index > 0)
+        except PartialResponseError as e:
+            # Part of the answer was already streamed, so another model cannot take over
+            router.record(candidate, section, error=e)
+            raise
+        except retryable_errors() as e:
+            router.record(candidate, section, error=e)
+            if index == len(candidates) - 1:
+                raise
+            print(f"\n[Routing] {candidate} failed for {section or 'unnamed'}; falling back to {candidates[index + 1]}")
+            continue
+        if stats["cache"] != "hit":
+            router.record(candidate, section, stats["latency"])
+        call_stats.update(stats)
+        return text
+
+def get_generation_metrics():
+    """Return a copy of the timings recorded so far"""
+    with _metrics_lock:
+        return list(_generation_metrics)
+
+def display_generation_metrics():
+    """Print time to first token and total time for every recorded call"""
+    metrics = get_generation_metrics()
+    if not metrics:
+        return
+    
+    print("\n[Generation Timing]\n")
+    print(f"{'Section':<32} {'First token':>12} {'Total':>10}")
+    for entry in metrics:
+        ttft = entry["time_to_first_token"]
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+        print(f"{entry['section']:<32} {ttft_text:>12} {entry['total_time']:>9.2f}s")
@@ -0,0 +1,115 @@
+import re
+import numpy as np
+from news_ranking import tokenize
+
+# Score keys, in the column order of the score matrix
+SCORE_KEYS = ["content_consistency", "writing_style", "layout", "seo"]
+
+# Press copy reads best around these values
+TARGET_SENTENCE_WORDS = 20
+TARGET_PARAGRAPH_WORDS = (40, 120)
+TARGET_READING_EASE = (30, 70)
+TARGET_HEADLINE_CHARS = (40, 110)
+TARGET_KEYWORD_DENSITY = (0.01, 0.05)
+
+SENTENCE_END = re.compile(r"[.!?]+(?:\s+|$)")
+WORD = re.compile(r"[A-Za-z0-9']+")
+VOWEL_GROUP = re.compile(r"[aeiouy]+", re.IGNORECASE)
+
+def kit_keywords(data):
+    """Terms a press kit should mention: company, product, topic and brand attributes"""
+    company = data["company_info"]
+    press_kit = data["press_kit_info"]
+    return {
+        "all": set(tokenize(f"{company['name']} {company['product']} {press_kit['topic']} "
+                            f"{company.get('brand_attributes', '')}")),
+        "company": set(tokenize(company["name"])),
+        "topic": set(tokenize(f"{company['product']} {press_kit['topic']}"))
+    }
+
+def _text_features(text, keywords):
+    """Raw counts for one text; everything numeric is combined later in one vectorized pass"""
+    paragraphs = [p for p in text.split("\n\n") if p.strip()]
+    sentences = [s for s in SENTENCE_END.split(text) if s.strip()]
+    sentence_words = [len(WORD.findall(sentence)) for sentence in sentences] or [0]
+    words = WORD.findall(text)
+    token_list = tokenize(text)
+    tokens = set(token_list)
+    headline = text.strip().split("\n", 1)[0] if text.strip() else ""
+    opening = set(tokenize(paragraphs[0])) if paragraphs else set()
+    keyword_hits = sum(1 for token in token_list if token in keywords["all"])
+    
+    return sentence_words, [
+        len(words),
+        max(1, len(sentences)),
+        max(1, len(paragraphs)),
+        max(len(words), len(VOWEL_GROUP.findall(text))),
+        len(tokens & keywords["all"]) / max(1, len(keywords["all"])),
+        float(bool(opening & keywords["company"])),
+        len(set(tokenize(headline)) & keywords["topic"]) / max(1, len(keywords["topic"])),
+        len(headline),
+        keyword_hits / max(1, len(words))
+    ]
+
+def _band_score(values, low, high, falloff):
+    """1 inside [low, high], falling linearly to 0 at `falloff` beyond either edge"""
+    distance = np.maximum(low - values, 0) + np.maximum(values - high, 0)
+    return np.clip(1 - distance / falloff, 0, 1)
+
+def score_texts(texts, keyword_sets):
+    """Score many texts at once; returns an (n, 4) array of 0-10 scores in SCORE_KEYS order
+    
+    Counting happens per text, but every ratio and score is computed on the
+    whole batch as arrays, so thousands of kits are scored in one pass.
+    """
+    if not texts:
+        return np.zeros((0, len(SCORE_KEYS)), dtype=int)
+    
+    features = [_text_features(text, keywords) for text, keywords in zip(texts, keyword_sets)]
+    sentence_lengths = [lengths for lengths, _ in features]
+    (words, sentences, paragraphs, syllables, coverage, company_in_opening, headline_topic,
+     headline_chars, keyword_density) = np.array([row for _, row in features], dtype=float).T
+    
+    # Sentence length mean and spread per text from one flat array
+    flat = np.concatenate([np.asarray(lengths, dtype=float) for lengths in sentence_lengths])
+    counts = np.array([len(lengths) for lengths in sentence_lengths])
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    mean_sentence = np.add.reduceat(flat, starts) / counts
+    spread = np.sqrt(np.maximum(np.add.reduceat(flat ** 2, starts) / counts - mean_sentence ** 2, 0))
+    
+    reading_ease = 206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / np.maximum(words, 1))
+    paragraph_words = words / paragraphs
+    
+    consistency = 0.7 * np.clip(coverage / 0.6, 0, 1) + 0.3 * company_in_opening
+    style = (0.4 * _band_score(reading_ease, *TARGET_READING_EASE, 40)
+             + 0.4 * _band_score(mean_sentence, TARGET_SENTENCE_WORDS - 8, TARGET_SENTENCE_WORDS + 5, 15)
+             + 0.2 * np.clip(spread / 6, 0, 1))
+    layout = (0.7 * _band_score(paragraph_words, *TARGET_PARAGRAPH_WORDS, 120)
+              + 0.3 * np.clip((paragraphs - 1) / 3, 0, 1))
+    seo = (0.35 * headline_topic
+           + 0.25 * _band_score(headline_chars, *TARGET_HEADLINE_CHARS, 60)
+           + 0.25 * _band_score(keyword_density, *TARGET_KEYWORD_DENSITY, 0.05)
+           + 0.15 * company_in_opening)
+    
+    scores = np.column_stack([consistency, style, layout, seo]) * 10
+    # Empty sections score zero across the board
+    scores[words == 0] = 0
+    return np.rint(np.clip(scores, 0, 10)).astype(int)
+
+def score_sections(sections, data):
+    """Score each section of one kit; returns {section: {score key: 0-10}}"""
+    keywords = kit_keywords(data)
+    names = list(sections)
+    matrix = score_texts([sections[name] for name in names], [keywords] * len(names))
+    return {name: dict(zip(SCORE_KEYS, (int(value) for value in row))) for name, row in zip(names, matrix)}
+
+def describe_scores(scores):
+    """Short feedback explaining the weakest local scores"""
+    hints = {
+        "content_consistency": "Mention the company, product and topic more directly.",
+        "writing_style": "Aim for sentences of about 20 words and plainer wording.",
+        "layout": "Break the text into paragraphs of roughly 40-120 words.",
+        "seo": "Put the topic in the headline and the company name in the opening paragraph."
+    }
+    weak = [hints[key] for key in SCORE_KEYS if scores[key] < 7]
+    return " ".join(weak) if weak else "Local checks found no issues."
@@ -0,0 +1,118 @@
+import re
+import threading
+from parallel import run_parallel, DEFAULT_MAX_WORKERS
+from gemini_client import generate_text
+from response_cache import get_cache, make_cache_key, is_refresh_requested
+
+# Sections of a kit that are localized; the review stays in the source language
+LOCALIZED_SECTIONS = ["press_release", "company_overview", "pr_message", "email_draft"]
+
+# Language tags such as "de", "fr-CA" or "zh-Hant"
+LOCALE_PATTERN = re.compile(r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$")
+
+def parse_locales(value):
+    """Accept a list of locales or a string separated by commas or semicolons; raises ValueError on a bad tag"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(";", ",").split(",")
+    locales = []
+    for locale in (item.strip() for item in value):
+        if not locale:
+            continue
+        if not LOCALE_PATTERN.match(locale):
+            raise ValueError(f"invalid locale '{locale}', expected a language tag such as 'de' or 'pt-BR'")
+        if locale not in locales:
+            locales.append(locale)
+    return locales
+
+def translate_paragraph(paragraph, locale):
+    """Translate one paragraph with Gemini"""
+    prompt = f"""
+    Translate the following press kit paragraph into the language of the locale '{locale}'.
+    
+    Keep company, product and people names, numbers, links and any markdown formatting unchanged.
+    Return only the translated paragraph.
+    
+    PARAGRAPH:
+    {paragraph}
+    """
+    
+    return generate_text(prompt, section=f"translation:{locale}").strip()
+
+class TranslationMemory:
+    """Paragraph translations keyed by the hash of the source paragraph and the locale
+    
+    Boilerplate that repeats across kits, such as a company overview or an
+    email sign-off, is translated once and then served from disk.
+    """
+    
+    def __init__(self):
+        self.cache = get_cache("translations")
+        self._lock = threading.Lock()
+        self.stats = {}
+    
+    def _count(self, locale, outcome):
+        with self._lock:
+            counts = self.stats.setdefault(locale, {"memory": 0, "translated": 0})
+            counts[outcome] += 1
+    
+    def translate(self, paragraphs, locales, max_workers=DEFAULT_MAX_WORKERS):
+        """Translate every paragraph into every locale; returns {(paragraph, locale): translation}
+        
+        Each distinct paragraph is looked up once per locale. Only the pairs
+        missing from the memory are sent to Gemini, all at the same time.
+        """
+        translations = {}
+        missing = {}
+        for locale in locales:
+            for paragraph in dict.fromkeys(paragraphs):
+                if not paragraph.strip():
+                    translations[(paragraph, locale)] = paragraph
+                    continue
+                key = make_cache_key("translation", locale, make_cache_key(paragraph))
+                cached = None
+                if self.cache is not None and not is_refresh_requested():
+                    cached = self.cache.get(key)
+                if cached is not None:
+                    translations[(paragraph, locale)] = cached
+                    self._count(locale, "memory")
+                else:
+                    missing[(paragraph, locale)] = key
+        
+        translated = run_parallel({
+            pair: (lambda pair=pair: translate_paragraph(*pair)) for pair in missing
+        }, max_workers=max_workers)
+        
+        for pair, text in translated.items():
+            if self.cache is not None:
+                self.cache.set(missing[pair], text)
+            translations[pair] = text
+            self._count(pair[1], "translated")
+        return translations
+
+def localize_content(content, locales, max_workers=DEFAULT_MAX_WORKERS, memory=None):
+    """Produce a localized copy of the generated content for each locale
+    
+    Sections are split into paragraphs, the way the output writers split
+    them, and every paragraph of every locale is translated concurrently
+    through the translation memory. Returns {locale: content}.
+    """
+    memory = memory or TranslationMemory()
+    sections = {section: content[section].split("\n\n") for section in LOCALIZED_SECTIONS if section in content}
+    translations = memory.translate([p for paragraphs in sections.values() for p in paragraphs], locales,
+                                    max_workers)
+    
+    localized = {}
+    for locale in locales:
+        localized[locale] = {
+            **content,
+            **{section: "\n\n".join(translations[(p, locale)] for p in paragraphs)
+               for section, paragraphs in sections.items()}
+        }
+    
+    for locale in locales:
+        counts = memory.stats.get(locale, {"memory": 0, "translated": 0})
+        print(f"[Localization] {locale}: {counts['translated']} paragraphs translated, "
+              f"{counts['memory']} from the translation memory")
+    return localized
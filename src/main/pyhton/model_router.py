@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from config import GEMINI_MODEL
+
+# Model tiers from strongest to fastest; calls only ever fall back towards the end
+TIER_ORDER = ["strong", "fast"]
+DEFAULT_FAST_MODEL = "gemini-1.5-flash"
+
+# Tier used by each call site. The press release and the review keep the
+# strongest model; short, low-stakes sections run on the fast tier.
+DEFAULT_ROUTES = {
+    "press_release": "strong",
+    "combined": "strong",
+    "company_overview": "strong",
+    "review": "strong",
+    "pr_message": "fast",
+    "email_draft": "fast",
+    "preview": "fast",
+    "translation": "fast"
+}
+CALL_SITES = list(DEFAULT_ROUTES)
+
+# A model is set aside for COOLDOWN seconds when its recent calls are slower
+# than the latency budget or fail too often, or straight away on a quota error
+DEFAULT_LATENCY_BUDGET = 30.0
+MAX_ERROR_RATE = 0.5
+MIN_SAMPLES = 5
+HEALTH_WINDOW = 50
+COOLDOWN = 60.0
+
+def call_site(section):
+    """The routing call site of a generate_text section name such as 'press_release:Formal'"""
+    site, _, rest = (section or "").partition(":")
+    if site == "revision":
+        # Revisions run on the same tier as the section they rewrite
+        site = rest
+    elif site == "quality_review":
+        site = "review"
+    return site
+
+def is_quota_error(error):
+    """Whether an API error means the model is over quota (HTTP 429)"""
+    return getattr(error, "code", None) == 429
+
+class ModelHealth:
+    """Recent latencies per call site and outcomes of one model"""
+    
+    def __init__(self):
+        self.latencies = {}
+        self.outcomes = deque(maxlen=HEALTH_WINDOW)
+        self.available_at = 0.0
+    
+    def error_rate(self):
+        if len(self.outcomes) < MIN_SAMPLES:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+    
+    def p95_latency(self, site):
+        latencies = self.latencies.get(site)
+        if not latencies or len(latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+    
+    def set_aside(self, cooldown):
+        """Skip this model for `cooldown` seconds, then try it again with a clean history"""
+        self.available_at = time.monotonic() + cooldown
+        self.latencies.clear()
+        self.outcomes.clear()
+
+class ModelRouter:
+    """Routes each call site to a model tier and falls back to faster tiers when a model degrades"""
+    
+    def __init__(self, tiers=None, routes=None, latency_budget=DEFAULT_LATENCY_BUDGET, cooldown=COOLDOWN):
+        self.tiers = {"strong": GEMINI_MODEL, "fast": DEFAULT_FAST_MODEL, **(tiers or {})}
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.latency_budget = latency_budget
+        self.cooldown = cooldown
+        self._health = {}
+        self._lock = threading.Lock()
+    
+    def _model_health(self, model_name):
+        health = self._health.get(model_name)
+        if health is None:
+            health = self._health[model_name] = ModelHealth()
+        return health
+    
+    def candidates(self, section):
+        """Models to try for a section, in order: its tier and the faster ones, available models first"""
+        tier = self.routes.get(call_site(section), TIER_ORDER[0])
+        chain = []
+        for name in TIER_ORDER[TIER_ORDER.index(tier):]:
+            if self.tiers[name] not in chain:
+                chain.append(self.tiers[name])
+        
+        now = time.monotonic()
+        with self._lock:
+            return sorted(chain, key=lambda model_name: self._model_health(model_name).available_at > now)
+    
+    def record(self, model_name, section, latency=None, error=None):
+        """Record the outcome of one API call; `latency` excludes time spent waiting for quota"""
+        site = call_site(section)
+        with self._lock:
+            health = self._model_health(model_name)
+            if error is not None and is_quota_error(error):
+                health.set_aside(self.cooldown)
+                return
+            
+            health.outcomes.append(error is None)
+            if latency is not None:
+                health.latencies.setdefault(site, deque(maxlen=HEALTH_WINDOW)).append(latency)
+            
+            p95 = health.p95_latency(site)
+            if health.error_rate() > MAX_ERROR_RATE or (p95 is not None and p95 > self.latency_budget):
+                health.set_aside(self.cooldown)
+    
+    def snapshot(self):
+        """Error rate, p95 latency per call site and availability of every model seen so far"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model_name: {
+                    "error_rate": health.error_rate(),
+                    "p95_latency": {site: health.p95_latency(site) for site in health.latencies},
+                    "available": health.available_at <= now
+                }
+                for model_name, health in self._health.items()
+            }
+
+_router = ModelRouter()
+_router_lock = threading.Lock()
+
+def configure_router(tiers=None, routes=None, latency_budget=DEFAULT_LATENCY_BUDGET):
+    """Replace the shared router: `tiers` maps tier names to models, `routes` maps call sites to tiers"""
+    global _router
+    unknown = [tier for tier in (routes or {}).values() if tier not in TIER_ORDER]
+    if unknown:
+        raise ValueError(f"unknown model tier '{unknown[0]}', expected one of {', '.join(TIER_ORDER)}")
+    with _router_lock:
+        _router = ModelRouter(tiers, routes, latency_budget)
+
+def get_router():
+    """Get the shared router"""
+    return _router
+
+def display_router_health():
+    """Print the error rate, availability and p95 latency per call site of every model seen so far"""
+    snapshot = get_router().snapshot()
+    if not snapshot:
+        return
+    
+    print("\n[Model Health]\n")
+    print(f"{'Model':<26} {'Errors':>7} {'Available':>9}  p95 latency")
+    for model_name, health in snapshot.items():
+        latencies = ", ".join(f"{site} {p95:.2f}s" for site, p95 in health["p95_latency"].items() if p95 is not None)
+        available = "yes" if health["available"] else "no"
+        print(f"{model_name[:26]:<26} {health['error_rate']:>7.0%} {available:>9}  {latencies or '-'}")
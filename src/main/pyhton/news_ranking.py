@@ -0,0 +1,75 @@
+import re
+import numpy as np
+
+# News items kept for the generation prompts
+SUPPLEMENTARY_ITEMS = 2
+
+# Headlines at least this similar (TF-IDF cosine) are treated as copies of one story
+DUPLICATE_THRESHOLD = 0.6
+
+# Common words that carry no signal about relevance
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+def _stem(token):
+    """Strip a plural or third-person "s" so "launches" and "launch" match"""
+    if len(token) > 4 and token.endswith("es") and token[-3] in "sxz" or token.endswith(("ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text):
+    """Lowercase, lightly stemmed words and numbers of a text, without stop words"""
+    return [_stem(token) for token in re.findall(r"[a-z0-9]+", str(text).lower()) if token not in STOP_WORDS]
+
+def tfidf_matrix(documents):
+    """Row-normalized TF-IDF matrix of `documents`, plus the vocabulary mapping each term to its column"""
+    tokenized = [tokenize(document) for document in documents]
+    vocabulary = {}
+    rows, columns = [], []
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            rows.append(row)
+            columns.append(vocabulary.setdefault(token, len(vocabulary)))
+    
+    counts = np.zeros((len(documents), max(1, len(vocabulary))))
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(columns, dtype=int)), 1.0)
+    
+    # Smoothed inverse document frequency, as in scikit-learn
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    weights = counts * idf
+    
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return weights / np.where(norms == 0, 1, norms), vocabulary
+
+def _item_text(item):
+    return f"{item.get('title', '')} {item.get('snippet', '')}"
+
+def rank_news(items, query, top_k=SUPPLEMENTARY_ITEMS, duplicate_threshold=DUPLICATE_THRESHOLD):
+    """Keep the `top_k` items most relevant to `query`, skipping near-duplicates of items already kept
+    
+    The query and every item are embedded in one TF-IDF space, so relevance
+    is a single matrix-vector product and all pairwise similarities are one
+    matrix product. Items sharing no terms with the query are dropped.
+    """
+    if not items:
+        return []
+    
+    # The query is the last row so its terms count towards the IDF like any headline
+    matrix, _ = tfidf_matrix([_item_text(item) for item in items] + [query])
+    vectors, query_vector = matrix[:-1], matrix[-1]
+    relevance = vectors @ query_vector
+    similarity = vectors @ vectors.T
+    
+    kept = []
+    for index in np.argsort(-relevance, kind="stable"):
+        if relevance[index] <= 0 or len(kept) == top_k:
+            break
+        if kept and similarity[index, kept].max() >= duplicate_threshold:
+            continue
+        kept.append(index)
+    
+    return [items[index] for index in kept]
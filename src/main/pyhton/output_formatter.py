@@ -1,190 +1,331 @@
+import io
 import os
-from fpdf import FPDF
+import time
+from concurrent.futures import ThreadPoolExecutor
+from artifact_store import get_store, kit_request_key, publish
+from tracing import record_span
 
-def format_as_markdown(data, content, review_result):
-    """Format the press kit as Markdown"""
-    markdown = f"""# Press Kit: {data['company_info']['name']}
-
-## Press Release: {data['press_kit_info']['topic']}
-{content['press_release']}
-
-## Company Overview
-{content['company_overview']}
+FORMAT_EXTENSIONS = {
+    "markdown": "md",
+    "pdf": "pdf",
+    "text": "txt"
+}
 
-## PR Message
-{content['pr_message']}
+# PDF rendering is CPU-bound, so it runs in worker processes shared across calls
+_pdf_pool = None
 
-## Email Draft
-{content['email_draft']}
+def _format_category(category):
+    """Turn a score key such as 'writing_style' into 'Writing Style'"""
+    return " ".join(word.capitalize() for word in category.split("_"))
 
-"""
+def build_document(data, content, review_result):
+    """Build the format-independent structure of a press kit
+    
+    The document is a title plus a list of sections. Body sections hold
+    paragraphs, list sections hold items and the review section holds score
+    items followed by feedback paragraphs. Every writer consumes this one
+    structure, so the kit is assembled once no matter how many formats are
+    rendered.
+    """
+    def body(heading, text, subject=None):
+        return {"kind": "body", "heading": heading, "subject": subject, "paragraphs": text.split('\n\n')}
+    
+    sections = [
+        body("Press Release", content['press_release'], data['press_kit_info']['topic']),
+        body("Company Overview", content['company_overview']),
+        body("PR Message", content['pr_message']),
+        body("Email Draft", content['email_draft'])
+    ]
     
     if data['supplementary_data']:
-        markdown += "## Supplementary Materials\n"
-        for item in data['supplementary_data']:
-            markdown += f"- {item['title']} (Source: {item['source']})\n"
-    
-    markdown += "\n## Quality Review Summary\n"
-    for category, score in review_result["scores"].items():
-        category_name = " ".join(word.capitalize() for word in category.split("_"))
-        markdown += f"- {category_name}: {score}/10\n"
-    
-    markdown += f"\n### Overall Feedback\n{review_result['overall_feedback']}\n"
-    
-    return markdown
+        sections.append({
+            "kind": "list",
+            "heading": "Supplementary Materials",
+            "subject": None,
+            "items": [f"{item['title']} (Source: {item['source']})" for item in data['supplementary_data']]
+        })
+    
+    sections.append({
+        "kind": "review",
+        "heading": "Quality Review Summary",
+        "subject": None,
+        "items": [f"{_format_category(category)}: {score}/10" for category, score in review_result["scores"].items()],
+        "paragraphs": review_result['overall_feedback'].split('\n\n')
+    })
+    
+    return {
+        "title": {"heading": "Press Kit", "subject": data['company_info']['name']},
+        "sections": sections
+    }
 
-def format_as_pdf(data, content, review_result):
-    """Format the press kit as PDF"""
+def _heading(section, upper=False):
+    """Render a section heading with its optional subject"""
+    heading = section["heading"].upper() if upper else section["heading"]
+    return f"{heading}: {section['subject']}" if section["subject"] is not None else heading
+
+def _write_paragraphs(f, paragraphs):
+    """Write paragraphs separated by blank lines, one at a time"""
+    for index, paragraph in enumerate(paragraphs):
+        if index:
+            f.write("\n\n")
+        f.write(paragraph)
+
+def write_markdown(document, f):
+    """Write the press kit document to a file object as Markdown"""
+    f.write(f"# {_heading(document['title'])}\n\n")
+    
+    for section in document["sections"]:
+        if section["kind"] == "body":
+            f.write(f"## {_heading(section)}\n")
+            _write_paragraphs(f, section["paragraphs"])
+            f.write("\n\n")
+        elif section["kind"] == "list":
+            f.write(f"## {_heading(section)}\n")
+            for item in section["items"]:
+                f.write(f"- {item}\n")
+        elif section["kind"] == "review":
+            f.write(f"\n## {_heading(section)}\n")
+            for item in section["items"]:
+                f.write(f"- {item}\n")
+            f.write("\n### Overall Feedback\n")
+            _write_paragraphs(f, section["paragraphs"])
+            f.write("\n")
+
+def write_text(document, f):
+    """Write the press kit document to a file object as plain text"""
+    f.write(f"{_heading(document['title'], upper=True)}\n\n")
+    
+    for section in document["sections"]:
+        f.write(f"{_heading(section, upper=True)}\n")
+        if section["kind"] == "body":
+            _write_paragraphs(f, section["paragraphs"])
+            f.write("\n\n")
+        elif section["kind"] == "list":
+            for item in section["items"]:
+                f.write(f"- {item}\n")
+            f.write("\n")
+        elif section["kind"] == "review":
+            for item in section["items"]:
+                f.write(f"{item}\n")
+            f.write("\nOVERALL FEEDBACK\n")
+            _write_paragraphs(f, section["paragraphs"])
+            f.write("\n")
+
+def render_pdf(document):
+    """Render the press kit document as an FPDF object"""
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     
-    # Set up font
-    pdf.set_font("Arial", "B", 16)
-    
     # Title
-    pdf.cell(0, 10, f"Press Kit: {data['company_info']['name']}", 0, 1, "C")
-    pdf.ln(10)
-    
-    # Press Release
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, f"Press Release: {data['press_kit_info']['topic']}", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    
-    # Break down the press release into paragraphs to avoid overflow
-    paragraphs = content['press_release'].split('\n\n')
-    for paragraph in paragraphs:
-        pdf.multi_cell(0, 10, paragraph)
-        pdf.ln(5)
-    pdf.ln(10)
-    
-    # Company Overview
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Company Overview", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    
-    # Break down the company overview into paragraphs
-    paragraphs = content['company_overview'].split('\n\n')
-    for paragraph in paragraphs:
-        pdf.multi_cell(0, 10, paragraph)
-        pdf.ln(5)
-    pdf.ln(10)
-    
-    # PR Message
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "PR Message", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    
-    # Break down the PR message into paragraphs
-    paragraphs = content['pr_message'].split('\n\n')
-    for paragraph in paragraphs:
-        pdf.multi_cell(0, 10, paragraph)
-        pdf.ln(5)
-    pdf.ln(10)
-    
-    # Email Draft
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Email Draft", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    
-    # Break down the email draft into paragraphs
-    paragraphs = content['email_draft'].split('\n\n')
-    for paragraph in paragraphs:
-        pdf.multi_cell(0, 10, paragraph)
-        pdf.ln(5)
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _heading(document["title"]), 0, 1, "C")
     pdf.ln(10)
     
-    # Supplementary Materials
-    if data['supplementary_data']:
+    for section in document["sections"]:
         pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, "Supplementary Materials", 0, 1)
+        pdf.cell(0, 10, _heading(section), 0, 1)
         pdf.set_font("Arial", "", 12)
-        for item in data['supplementary_data']:
-            pdf.multi_cell(0, 10, f"- {item['title']} (Source: {item['source']})")
-        pdf.ln(10)
-    
-    # Quality Review
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Quality Review Summary", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    for category, score in review_result["scores"].items():
-        category_name = " ".join(word.capitalize() for word in category.split("_"))
-        pdf.cell(0, 10, f"{category_name}: {score}/10", 0, 1)
-    
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "Overall Feedback:", 0, 1)
-    pdf.set_font("Arial", "", 12)
-    
-    # Break down the overall feedback into paragraphs
-    paragraphs = review_result['overall_feedback'].split('\n\n')
-    for paragraph in paragraphs:
-        pdf.multi_cell(0, 10, paragraph)
-        pdf.ln(5)
+        
+        if section["kind"] == "body":
+            # One multi_cell per paragraph to avoid overflow
+            for paragraph in section["paragraphs"]:
+                pdf.multi_cell(0, 10, paragraph)
+                pdf.ln(5)
+            pdf.ln(10)
+        elif section["kind"] == "list":
+            for item in section["items"]:
+                pdf.multi_cell(0, 10, f"- {item}")
+            pdf.ln(10)
+        elif section["kind"] == "review":
+            for item in section["items"]:
+                pdf.cell(0, 10, item, 0, 1)
+            
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(0, 10, "Overall Feedback:", 0, 1)
+            pdf.set_font("Arial", "", 12)
+            
+            for paragraph in section["paragraphs"]:
+                pdf.multi_cell(0, 10, paragraph)
+                pdf.ln(5)
     
     return pdf
 
+def write_pdf(document, path):
+    """Render a press kit document (see build_document) to `path`; returns the number of pages
+    
+    The layout matches render_pdf, but pages are written as they fill up
+    and font metrics are loaded once per process, so long kits and large
+    batches render quickly with flat memory.
+    """
+    from pdf_engine import StreamingPdf
+    pdf = StreamingPdf(path)
+    try:
+        pdf.add_page()
+        
+        # Title
+        pdf.set_font("bold", 16)
+        pdf.cell(_heading(document["title"]), align="C")
+        pdf.ln(10)
+        
+        for section in document["sections"]:
+            pdf.set_font("bold", 14)
+            pdf.cell(_heading(section))
+            pdf.set_font("regular", 12)
+            
+            if section["kind"] == "body":
+                for paragraph in section["paragraphs"]:
+                    pdf.multi_cell(paragraph)
+                    pdf.ln(5)
+                pdf.ln(10)
+            elif section["kind"] == "list":
+                for item in section["items"]:
+                    pdf.multi_cell(f"- {item}")
+                pdf.ln(10)
+            elif section["kind"] == "review":
+                for item in section["items"]:
+                    pdf.cell(item)
+                
+                pdf.set_font("bold", 12)
+                pdf.cell("Overall Feedback:")
+                pdf.set_font("regular", 12)
+                
+                for paragraph in section["paragraphs"]:
+                    pdf.multi_cell(paragraph)
+                    pdf.ln(5)
+    finally:
+        pdf.close()
+    
+    return pdf.page_count
+
+def format_as_markdown(data, content, review_result):
+    """Format the press kit as Markdown"""
+    buffer = io.StringIO()
+    write_markdown(build_document(data, content, review_result), buffer)
+    return buffer.getvalue()
+
+def format_as_pdf(data, content, review_result):
+    """Format the press kit as PDF"""
+    return render_pdf(build_document(data, content, review_result))
+
 def format_as_text(data, content, review_result):
     """Format the press kit as plain text"""
-    text = f"PRESS KIT: {data['company_info']['name']}\n\n"
-    
-    text += f"PRESS RELEASE: {data['press_kit_info']['topic']}\n"
-    text += f"{content['press_release']}\n\n"
-    
-    text += "COMPANY OVERVIEW\n"
-    text += f"{content['company_overview']}\n\n"
-    
-    text += "PR MESSAGE\n"
-    text += f"{content['pr_message']}\n\n"
-    
-    text += "EMAIL DRAFT\n"
-    text += f"{content['email_draft']}\n\n"
-    
-    if data['supplementary_data']:
-        text += "SUPPLEMENTARY MATERIALS\n"
-        for item in data['supplementary_data']:
-            text += f"- {item['title']} (Source: {item['source']})\n"
-        text += "\n"
-    
-    text += "QUALITY REVIEW SUMMARY\n"
-    for category, score in review_result["scores"].items():
-        category_name = " ".join(word.capitalize() for word in category.split("_"))
-        text += f"{category_name}: {score}/10\n"
-    
-    text += "\nOVERALL FEEDBACK\n"
-    text += f"{review_result['overall_feedback']}\n"
-    
-    return text
+    buffer = io.StringIO()
+    write_text(build_document(data, content, review_result), buffer)
+    return buffer.getvalue()
 
-def save_output(data, content, review_result, output_format="markdown"):
-    """Save the press kit in the specified format"""
+def _write_text_file(writer, document, path):
+    """Stream a text-based format straight to its file"""
+    with open(path, "w") as f:
+        writer(document, f)
+    return path
+
+def _write_pdf_file(document, path):
+    """Render and save a PDF; runs in a worker process"""
+    write_pdf(document, path)
+    return path
+
+def _get_pdf_pool():
+    """Get the process pool used for PDF rendering"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        # multiprocessing is only imported once a PDF is actually rendered
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # By now gRPC, batch and prefetch threads are running; a forked worker could
+        # inherit a lock one of them held, so workers start from a clean process
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pdf_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context(method))
+    return _pdf_pool
+
+TEXT_WRITERS = {
+    "markdown": write_markdown,
+    "text": write_text
+}
+
+def open_draft_stream(data, section):
+    """Open the draft file that streamed chunks of a section are written to"""
+    os.makedirs(os.path.join("output", "drafts"), exist_ok=True)
     
-    # Create output directory if it doesn't exist
-    if not os.path.exists("output"):
-        os.makedirs("output")
+    company_name = data['company_info']['name'].replace(" ", "_").lower()
+    draft_path = os.path.join("output", "drafts", f"press_kit_{company_name}_{section}.md")
+    return open(draft_path, "w", encoding="utf-8")
+
+def save_kit(data, content, review_result, output_format="markdown", request_key=None, locale=None):
+    """Render the press kit into the artifact store and publish it under output/
+    
+    Every format is rendered to a scratch file, moved into the store under its
+    content hash and then copied atomically to output/press_kit_<company>.<ext>,
+    so concurrent runs never leave a half-written file and earlier kits stay
+    retrievable from the store. A localized kit is saved as
+    press_kit_<company>_<locale>.<ext>. Returns the kit id, the published
+    paths and the stored file of each format.
+    """
+    os.makedirs("output", exist_ok=True)
+    store = get_store()
+    
+    requested = [output_format] if isinstance(output_format, str) else list(output_format)
+    formats = []
+    for fmt in requested:
+        if fmt not in FORMAT_EXTENSIONS:
+            print(f"Unsupported output format: {fmt}. Defaulting to markdown.")
+            fmt = "markdown"
+        if fmt not in formats:
+            formats.append(fmt)
     
     company_name = data['company_info']['name'].replace(" ", "_").lower()
-    file_name = f"press_kit_{company_name}"
-    
-    if output_format == "markdown":
-        markdown_content = format_as_markdown(data, content, review_result)
-        with open(f"output/{file_name}.md", "w") as f:
-            f.write(markdown_content)
-        print(f"\nPress kit saved as output/{file_name}.md")
-        return f"output/{file_name}.md"
-    
-    elif output_format == "pdf":
-        pdf = format_as_pdf(data, content, review_result)
-        pdf_path = f"output/{file_name}.pdf"
-        pdf.output(pdf_path)
-        print(f"\nPress kit saved as {pdf_path}")
-        return pdf_path
-    
-    elif output_format == "text":
-        text_content = format_as_text(data, content, review_result)
-        with open(f"output/{file_name}.txt", "w") as f:
-            f.write(text_content)
-        print(f"\nPress kit saved as output/{file_name}.txt")
-        return f"output/{file_name}.txt"
-    
-    else:
-        print(f"Unsupported output format: {output_format}. Defaulting to markdown.")
-        return save_output(data, content, review_result, "markdown")
\ No newline at end of file
+    file_name = f"press_kit_{company_name}" + (f"_{locale.lower()}" if locale else "")
+    document = build_document(data, content, review_result)
+    
+    with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+        futures = []
+        for fmt in formats:
+            path = store.temp_path(FORMAT_EXTENSIONS[fmt])
+            started = time.perf_counter()
+            if fmt == "pdf":
+                future = _get_pdf_pool().submit(_write_pdf_file, document, path)
+            else:
+                future = executor.submit(_write_text_file, TEXT_WRITERS[fmt], document, path)
+            future.add_done_callback(
+                lambda _, fmt=fmt, path=path, started=started:
+                    record_span(f"render:{fmt}", "render", started, time.perf_counter() - started, path=path)
+            )
+            futures.append(future)
+        rendered = [future.result() for future in futures]
+    
+    artifacts = {}
+    files = {}
+    paths = []
+    for fmt, path in zip(formats, rendered):
+        extension = FORMAT_EXTENSIONS[fmt]
+        digest = store.put_file(path, extension)
+        artifacts[fmt] = (digest, extension)
+        files[fmt] = store.object_path(digest, extension)
+        paths.append(publish(files[fmt], f"output/{file_name}.{extension}"))
+    
+    style = content.get("selected_style")
+    if request_key is None:
+        request_key = kit_request_key(data["company_info"], data["press_kit_info"], style,
+                                      data.get("supplementary_data"), locale)
+    sections = {name: text for name, text in content.items() if name != "selected_style" and isinstance(text, str)}
+    kit_id = store.record_kit(request_key, data["company_info"]["name"], data["press_kit_info"]["topic"], style,
+                              review_result.get("scores", {}), sections, artifacts, locale)
+    
+    for path in paths:
+        print(f"\nPress kit saved as {path}")
+    
+    return {"kit_id": kit_id, "paths": paths, "files": files}
+
+def save_output(data, content, review_result, output_format="markdown", locale=None):
+    """Save the press kit in one or more formats
+    
+    `output_format` is a single format name, in which case the saved path is
+    returned, or a list of formats, in which case a list of paths is
+    returned. The document is built once and every format is rendered at
+    the same time: PDFs in a process pool, text formats in threads. Each
+    saved kit is also kept in the artifact store; see save_kit. With a
+    `locale`, the files of that localized variant are written.
+    """
+    paths = save_kit(data, content, review_result, output_format, locale=locale)["paths"]
+    return paths[0] if isinstance(output_format, str) else paths
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from tracing import mark_queued
+
+# Default upper bound on simultaneous Gemini requests
+DEFAULT_MAX_WORKERS = 4
+
+def _run_queued(task, queued_at, limit=None, background=False):
+    """Run a task, noting how long it waited for a free worker and, with a `limit`, a free slot"""
+    if limit is None:
+        mark_queued(queued_at)
+        return task()
+    with limit.slot(background):
+        mark_queued(queued_at)
+        return task()
+
+class CallLimit:
+    """Caps how many tasks run at the same time across several pools
+    
+    Background tasks only take a free slot when no foreground task is
+    waiting for one and the slot is not reserved, so work the user is
+    watching goes first.
+    """
+    
+    def __init__(self, limit=DEFAULT_MAX_WORKERS):
+        self.limit = max(1, limit or 1)
+        self._running = 0
+        self._waiting = 0
+        self._reserved = 0
+        self._condition = threading.Condition()
+    
+    @contextmanager
+    def reserve(self, count):
+        """Keep slots for the next `count` foreground tasks started in the block
+        
+        Background tasks cannot preempt a running call, so reserve the slots
+        before starting them; they then only take the slots left over.
+        """
+        with self._condition:
+            self._reserved += count
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._reserved -= min(count, self._reserved)
+                self._condition.notify_all()
+    
+    @contextmanager
+    def slot(self, background=False):
+        """Hold one slot for the duration of the block"""
+        with self._condition:
+            if background:
+                while self._running + self._reserved >= self.limit or self._waiting:
+                    self._condition.wait()
+            else:
+                self._waiting += 1
+                try:
+                    while self._running >= self.limit:
+                        self._condition.wait()
+                finally:
+                    self._waiting -= 1
+                self._reserved = max(0, self._reserved - 1)
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+
+def run_parallel(tasks, max_workers=DEFAULT_MAX_WORKERS, limit=None):
+    """Run independent callables concurrently and collect their results
+    
+    `tasks` maps a name to a zero-argument callable. The returned dict has the
+    same keys in the same order, regardless of which call finished first.
+    The first exception raised by any task is re-raised to the caller.
+    With a shared `limit`, the tasks also count against that CallLimit.
+    """
+    if not tasks:
+        return {}
+    
+    workers = max(1, min(max_workers or 1, len(tasks)))
+    if workers == 1:
+        if limit is None:
+            return {name: task() for name, task in tasks.items()}
+        return {name: _run_queued(task, time.perf_counter(), limit) for name, task in tasks.items()}
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(_run_queued, task, time.perf_counter(), limit) for name, task in tasks.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+class BackgroundTasks:
+    """Independent callables started immediately and collected, or cancelled, later
+    
+    Unlike run_parallel this returns straight away, so the tasks can overlap
+    with work that needs the user, such as choosing a style. Tasks can watch
+    the `cancelled` event to stop early; tasks that have not started are dropped.
+    Every task runs in a background slot of `limit`, a CallLimit of
+    `max_workers` unless one is passed; share it with the foreground work
+    through run_parallel so both stay within one bound, and reserve the
+    foreground slots before starting the tasks.
+    """
+    
+    def __init__(self, tasks, max_workers=DEFAULT_MAX_WORKERS, cancelled=None, limit=None):
+        self.cancelled = cancelled if cancelled is not None else threading.Event()
+        self.limit = limit if limit is not None else CallLimit(max_workers)
+        workers = max(1, min(max_workers or 1, len(tasks)))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="background-task")
+        self._futures = {
+            name: self._executor.submit(_run_queued, task, time.perf_counter(), self.limit, True)
+            for name, task in tasks.items()
+        }
+    
+    def result(self):
+        """Wait for every task and return their results keyed and ordered like the tasks"""
+        try:
+            return {name: future.result() for name, future in self._futures.items()}
+        finally:
+            self._executor.shutdown(wait=False)
+    
+    def cancel(self):
+        """Drop tasks that have not started and ask running ones to stop; their results are discarded"""
+        self.cancelled.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,99 @@
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import click
+from output_formatter import build_document, render_pdf, write_pdf
+
+ENGINES = ["streaming", "fpdf"]
+
+WORDS = ("launch product market customers growth platform partners industry annual report "
+         "innovation team global results quarter announce revenue service media release").split()
+
+def synthetic_document(paragraphs, seed):
+    """A press kit document with `paragraphs` paragraphs of filler text per section"""
+    rng = random.Random(seed)
+    
+    def text():
+        return "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))
+                           for _ in range(paragraphs))
+    
+    data = {
+        "company_info": {"name": f"Company {seed}"},
+        "press_kit_info": {"topic": "Benchmark"},
+        "supplementary_data": [{"title": "Industry news", "source": "Wire"}]
+    }
+    content = {section: text() for section in ("press_release", "company_overview", "pr_message", "email_draft")}
+    review_result = {"scores": {"content_consistency": 8, "writing_style": 7}, "overall_feedback": text()}
+    return build_document(data, content, review_result)
+
+def _render(engine, paragraphs, seed, path):
+    """Render one kit in a worker process; returns its page count and the worker's peak RSS in KB"""
+    document = synthetic_document(paragraphs, seed)
+    if engine == "streaming":
+        pages = write_pdf(document, path)
+    else:
+        pdf = render_pdf(document)
+        pdf.output(path)
+        pages = pdf.page_no()
+    return pages, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_benchmark(kits, engine, paragraphs, workers, directory):
+    """Render `kits` PDFs across `workers` processes and summarise the run"""
+    started = time.perf_counter()
+    # A fresh pool per run, so the peak RSS belongs to this run only
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_render, engine, paragraphs, seed, os.path.join(directory, f"kit_{seed}.pdf"))
+            for seed in range(kits)
+        ]
+        results = [future.result() for future in futures]
+    wall_time = time.perf_counter() - started
+    
+    pages = sum(page_count for page_count, _ in results)
+    return {
+        "engine": engine,
+        "kits": kits,
+        "pages": pages,
+        "wall_time": wall_time,
+        "pages_per_second": pages / wall_time,
+        "kits_per_second": kits / wall_time,
+        "peak_worker_rss_mb": max(rss for _, rss in results) / 1024
+    }
+
+def display_summary(summary):
+    print(f"[{summary['engine']}] {summary['kits']} kits, {summary['pages']} pages in {summary['wall_time']:.2f}s: "
+          f"{summary['pages_per_second']:.1f} pages/s, {summary['kits_per_second']:.1f} kits/s, "
+          f"peak worker RSS {summary['peak_worker_rss_mb']:.1f} MB")
+
+@click.command()
+@click.option('--kits', '-n', type=click.IntRange(min=1), multiple=True, default=[1, 100, 1000],
+              help='Number of press kits per run; repeat for several runs')
+@click.option('--engine', '-e', type=click.Choice(ENGINES), multiple=True, default=ENGINES,
+              help='PDF engine to measure; repeat to compare engines')
+@click.option('--paragraphs', type=click.IntRange(min=1), default=10, help='Paragraphs per section of each kit')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=os.cpu_count() or 1,
+              help='Worker processes rendering PDFs')
+@click.option('--json-output', type=click.Path(dir_okay=False), default=None, help='Also write the results as JSON')
+def main(kits, engine, paragraphs, workers, json_output):
+    """Measure PDF rendering throughput and memory for growing numbers of press kits"""
+    summaries = []
+    print(f"\n[PDF Benchmark] {workers} workers, {paragraphs} paragraphs per section\n")
+    
+    for kit_count in kits:
+        for engine_name in engine:
+            with tempfile.TemporaryDirectory(prefix="pressagent-pdf-") as directory:
+                summary = run_benchmark(kit_count, engine_name, paragraphs, workers, directory)
+            display_summary(summary)
+            summaries.append(summary)
+    
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\nResults saved at: {json_output}")
+
+if __name__ == '__main__':
+    main()
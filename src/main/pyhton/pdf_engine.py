@@ -0,0 +1,205 @@
+import threading
+import zlib
+
+# Page geometry in millimetres, matching the FPDF() defaults used by render_pdf
+PAGE_WIDTH = 210.0
+PAGE_HEIGHT = 297.0
+MARGIN = 10.0
+BOTTOM_MARGIN = 20.0
+CELL_MARGIN = MARGIN / 10
+LINE_HEIGHT = 10
+POINTS_PER_MM = 72 / 25.4
+
+# Core fonts: resource name, PDF base font and the key of its metrics in fpdf
+FONTS = {
+    "regular": ("F1", "Helvetica", "helvetica"),
+    "bold": ("F2", "Helvetica-Bold", "helveticaB")
+}
+
+# Glyph widths (per 1000 units of font size) for the 256 WinAnsi codes, loaded once per process
+_font_widths = {}
+_font_widths_lock = threading.Lock()
+
+def font_widths(style):
+    """Width table of a font style, shared by every document rendered in this process"""
+    widths = _font_widths.get(style)
+    if widths is None:
+        from fpdf.fonts import fpdf_charwidths
+        with _font_widths_lock:
+            table = fpdf_charwidths[FONTS[style][2]]
+            widths = _font_widths.setdefault(style, [table.get(chr(code), 0) for code in range(256)])
+    return widths
+
+def _encode(text):
+    """Encode text for the WinAnsi core fonts, replacing characters they cannot show"""
+    return text.encode("cp1252", errors="replace")
+
+def _escape(encoded):
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"")
+
+class StreamingPdf:
+    """Writes a PDF page by page, so only the page being laid out is held in memory
+    
+    Each finished page is compressed and written to the file straight away;
+    the page tree, fonts and cross-reference table follow when it is closed.
+    """
+    
+    PAGES_ID = 1
+    RESOURCES_ID = 2
+    
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3
+        self.commands = None
+        self.y = MARGIN
+        self.style = None
+        self.size = None
+        self.file.write(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+    
+    @property
+    def page_count(self):
+        return len(self.page_ids) + (1 if self.commands is not None else 0)
+    
+    def _begin_object(self, object_id=None):
+        if object_id is None:
+            object_id = self.next_id
+            self.next_id += 1
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(f"{object_id} 0 obj\n".encode("ascii"))
+        return object_id
+    
+    def _end_object(self):
+        self.file.write(b"\nendobj\n")
+    
+    def _finish_page(self):
+        if self.commands is None:
+            return
+        stream = zlib.compress(b"\n".join(self.commands))
+        self.commands = None
+        
+        content_id = self._begin_object()
+        self.file.write(f"<</Filter /FlateDecode /Length {len(stream)}>>\nstream\n".encode("ascii"))
+        self.file.write(stream)
+        self.file.write(b"\nendstream")
+        self._end_object()
+        
+        page_id = self._begin_object()
+        self.file.write(
+            f"<</Type /Page /Parent {self.PAGES_ID} 0 R /Resources {self.RESOURCES_ID} 0 R "
+            f"/Contents {content_id} 0 R>>".encode("ascii")
+        )
+        self._end_object()
+        self.page_ids.append(page_id)
+    
+    def add_page(self):
+        """Write out the current page and start a new one"""
+        self._finish_page()
+        self.commands = []
+        self.y = MARGIN
+        if self.style is not None:
+            self._select_font()
+    
+    def _select_font(self):
+        self.commands.append(f"BT /{FONTS[self.style][0]} {self.size:.2f} Tf ET".encode("ascii"))
+    
+    def set_font(self, style, size):
+        if (style, size) != (self.style, self.size):
+            self.style, self.size = style, size
+            if self.commands is not None:
+                self._select_font()
+    
+    def text_width(self, encoded):
+        """Width of encoded text in millimetres at the current font size"""
+        widths = font_widths(self.style)
+        return sum(widths[code] for code in encoded) * self.size / 1000 / POINTS_PER_MM
+    
+    def ln(self, height=LINE_HEIGHT):
+        self.y += height
+    
+    def cell(self, text, align="L"):
+        """Write one line of text and move to the next line, breaking the page when it is full"""
+        if self.y + LINE_HEIGHT > PAGE_HEIGHT - BOTTOM_MARGIN:
+            self.add_page()
+        
+        encoded = _encode(text) if isinstance(text, str) else text
+        if encoded:
+            if align == "C":
+                x = MARGIN + (PAGE_WIDTH - 2 * MARGIN - self.text_width(encoded)) / 2
+            else:
+                x = MARGIN + CELL_MARGIN
+            baseline = self.y + 0.5 * LINE_HEIGHT + 0.3 * self.size / POINTS_PER_MM
+            self.commands.append(
+                b"BT %.2f %.2f Td (%s) Tj ET" % (x * POINTS_PER_MM, (PAGE_HEIGHT - baseline) * POINTS_PER_MM,
+                                                _escape(encoded))
+            )
+        self.y += LINE_HEIGHT
+    
+    def wrap(self, text):
+        """Split text into encoded lines that fit the page width, breaking at spaces where possible"""
+        widths = font_widths(self.style)
+        limit = (PAGE_WIDTH - 2 * MARGIN - 2 * CELL_MARGIN) * POINTS_PER_MM * 1000 / self.size
+        for paragraph in _encode(text).split(b"\n"):
+            start = 0
+            space = -1
+            width = 0
+            index = 0
+            while index < len(paragraph):
+                code = paragraph[index]
+                if code == 32:
+                    space = index
+                width += widths[code]
+                if width > limit and index > start:
+                    end = space if space > start else index
+                    yield paragraph[start:end]
+                    start = end + 1 if end == space else end
+                    index = start
+                    space = -1
+                    width = 0
+                    continue
+                index += 1
+            yield paragraph[start:]
+    
+    def multi_cell(self, text):
+        """Write text wrapped to the page width"""
+        for line in self.wrap(text):
+            self.cell(line)
+    
+    def close(self):
+        """Write the page tree, fonts and cross-reference table, then close the file"""
+        self._finish_page()
+        
+        font_ids = {}
+        for name, base_font, _ in FONTS.values():
+            font_ids[name] = self._begin_object()
+            self.file.write(
+                f"<</Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding>>".encode("ascii")
+            )
+            self._end_object()
+        
+        self._begin_object(self.RESOURCES_ID)
+        fonts = " ".join(f"/{name} {font_id} 0 R" for name, font_id in font_ids.items())
+        self.file.write(f"<</ProcSet [/PDF /Text] /Font <<{fonts}>>>>".encode("ascii"))
+        self._end_object()
+        
+        self._begin_object(self.PAGES_ID)
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self.file.write(
+            f"<</Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} "
+            f"/MediaBox [0 0 {PAGE_WIDTH * POINTS_PER_MM:.2f} {PAGE_HEIGHT * POINTS_PER_MM:.2f}]>>".encode("ascii")
+        )
+        self._end_object()
+        
+        catalog_id = self._begin_object()
+        self.file.write(f"<</Type /Catalog /Pages {self.PAGES_ID} 0 R>>".encode("ascii"))
+        self._end_object()
+        
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {self.next_id}\n0000000000 65535 f \n".encode("ascii"))
+        for object_id in range(1, self.next_id):
+            self.file.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode("ascii"))
+        self.file.write(
+            f"trailer\n<</Size {self.next_id} /Root {catalog_id} 0 R>>\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii")
+        )
+        self.file.close()
@@ -1,40 +1,42 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL
+import threading
+from collections import OrderedDict
+from gemini_client import generate_text
+from parallel import run_parallel, DEFAULT_MAX_WORKERS
+from response_cache import make_cache_key
 
-# Configure the Gemini API
-genai.configure(api_key=GEMINI_API_KEY)
+# Sections of the press kit that are reviewed, with their display names
+REVIEW_SECTIONS = {
+    "press_release": "Press Release",
+    "company_overview": "Company Overview",
+    "pr_message": "PR Message",
+    "email_draft": "Email Draft"
+}
 
-def get_gemini_model():
-    """Get the Gemini model instance"""
-    return genai.GenerativeModel(GEMINI_MODEL)
+# Score labels in the review response and the keys they map to
+SCORE_LABELS = {
+    "Content Consistency:": "content_consistency",
+    "Writing Style and Tone:": "writing_style",
+    "Layout and Structure:": "layout",
+    "SEO Optimization:": "seo"
+}
 
-def review_press_kit(content):
-    """Review the generated press kit and provide feedback"""
-    print("\n[Quality Review Phase]\n")
-    
-    model = get_gemini_model()
-    
-    review_prompt = f"""
-    Review the following press kit components and provide scores (0-10) and detailed feedback on:
-    1. Content Consistency
-    2. Writing Style and Tone
-    3. Layout and Structure
-    4. SEO Optimization
-    
-    Also provide overall feedback and suggestions for improvement.
-    
-    PRESS RELEASE:
-    {content['press_release']}
-    
-    COMPANY OVERVIEW:
-    {content['company_overview']}
-    
-    PR MESSAGE:
-    {content['pr_message']}
-    
-    EMAIL DRAFT:
-    {content['email_draft']}
-    
+DEFAULT_SCORE = 7
+DEFAULT_FEEDBACK = "The content is well-written and appropriate for a press kit."
+
+# "llm" reviews every section with Gemini; "local" only uses the local scores;
+# "auto" trusts local scores that are clearly high or clearly low and asks Gemini about the rest
+REVIEW_POLICIES = ["llm", "auto", "local"]
+DEFAULT_ACCEPT_ABOVE = 8
+DEFAULT_REJECT_BELOW = 4
+_review_policy = {"policy": "llm", "accept_above": DEFAULT_ACCEPT_ABOVE, "reject_below": DEFAULT_REJECT_BELOW}
+
+# Reviews of individual sections, keyed by a hash of the section text, so
+# unchanged sections are not reviewed again after a modification
+MAX_MEMOIZED_REVIEWS = 512
+_section_reviews = OrderedDict()
+_section_reviews_lock = threading.Lock()
+
+REVIEW_FORMAT = """
     Format your response as follows:
     
     Content Consistency: [SCORE]/10
@@ -52,60 +54,204 @@ def review_press_kit(content):
     Overall Feedback:
     [COMPREHENSIVE FEEDBACK AND SUGGESTIONS]
     """
+
+def configure_review_policy(policy="llm", accept_above=DEFAULT_ACCEPT_ABOVE, reject_below=DEFAULT_REJECT_BELOW):
+    """Choose when sections are reviewed by Gemini and when the local scores are enough
     
-    response = model.generate_content(review_prompt)
-    review_text = response.text
+    Under "auto", a section whose average local score is at least
+    `accept_above` or below `reject_below` is not sent to Gemini.
+    """
+    _review_policy.update(policy=policy, accept_above=accept_above, reject_below=reject_below)
+
+def parse_review_text(review_text, fallback_scores=None):
+    """Extract scores and overall feedback from a review response
     
-    # Parse the review text to extract scores and feedback
+    Scores missing from the response are taken from `fallback_scores` (the
+    local scores) when given, otherwise DEFAULT_SCORE.
+    """
+    fallback_scores = fallback_scores or {}
     lines = review_text.split('\n')
     scores = {}
     overall_feedback = ""
-    current_section = None
     
     for i, line in enumerate(lines):
-        if "Content Consistency:" in line:
-            try:
-                scores["content_consistency"] = int(line.split(':')[1].strip().split('/')[0])
-            except (IndexError, ValueError):
-                scores["content_consistency"] = 7  # Default fallback
-            current_section = "content_consistency"
-        elif "Writing Style and Tone:" in line:
-            try:
-                scores["writing_style"] = int(line.split(':')[1].strip().split('/')[0])
-            except (IndexError, ValueError):
-                scores["writing_style"] = 7  # Default fallback
-            current_section = "writing_style"
-        elif "Layout and Structure:" in line:
-            try:
-                scores["layout"] = int(line.split(':')[1].strip().split('/')[0])
-            except (IndexError, ValueError):
-                scores["layout"] = 7  # Default fallback
-            current_section = "layout"
-        elif "SEO Optimization:" in line:
-            try:
-                scores["seo"] = int(line.split(':')[1].strip().split('/')[0])
-            except (IndexError, ValueError):
-                scores["seo"] = 7  # Default fallback
-            current_section = "seo"
-        elif "Overall Feedback:" in line:
+        if "Overall Feedback:" in line:
             overall_feedback = "\n".join(lines[i+1:]).strip()
             break
+        
+        for label, key in SCORE_LABELS.items():
+            if label in line:
+                try:
+                    scores[key] = int(line.split(':')[1].strip().split('/')[0])
+                except (IndexError, ValueError):
+                    scores[key] = fallback_scores.get(key, DEFAULT_SCORE)  # Default fallback
+                break
     
     # Ensure all expected scores exist
-    for key in ["content_consistency", "writing_style", "layout", "seo"]:
+    for key in SCORE_LABELS.values():
         if key not in scores:
-            scores[key] = 7  # Default score
+            scores[key] = fallback_scores.get(key, DEFAULT_SCORE)  # Default score
+    
+    return scores, overall_feedback
+
+def review_section(section, text, fallback_scores=None):
+    """Review a single press kit section, reusing an earlier review of identical text"""
+    memo_key = make_cache_key(section, text)
+    with _section_reviews_lock:
+        if memo_key in _section_reviews:
+            _section_reviews.move_to_end(memo_key)
+            return _section_reviews[memo_key]
+    
+    review_prompt = f"""
+    Review the following {REVIEW_SECTIONS[section]} from a press kit and provide scores (0-10) and detailed feedback on:
+    1. Content Consistency
+    2. Writing Style and Tone
+    3. Layout and Structure
+    4. SEO Optimization
+    
+    Also provide overall feedback and suggestions for improvement.
+    
+    {REVIEW_SECTIONS[section].upper()}:
+    {text}
+    {REVIEW_FORMAT}"""
+    
+    review_text = generate_text(review_prompt, section=f"quality_review:{section}")
+    scores, feedback = parse_review_text(review_text, fallback_scores)
+    
+    review = {
+        "scores": scores,
+        "feedback": feedback,
+        "full_review": review_text,
+        "source": "llm"
+    }
+    
+    with _section_reviews_lock:
+        _section_reviews[memo_key] = review
+        while len(_section_reviews) > MAX_MEMOIZED_REVIEWS:
+            _section_reviews.popitem(last=False)
+    
+    return review
+
+def local_review(scores):
+    """A section review built from local scores alone"""
+    from local_scoring import describe_scores
+    
+    feedback = describe_scores(scores)
+    full_review = "\n\n".join(
+        f"{label} {scores[key]}/10" for label, key in SCORE_LABELS.items()
+    ) + f"\n\nOverall Feedback:\n{feedback}"
+    
+    return {
+        "scores": dict(scores),
+        "feedback": feedback,
+        "full_review": full_review,
+        "source": "local"
+    }
+
+def review_sections(sections, data=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Review sections concurrently, applying the review policy when the kit `data` is known
+    
+    Every section is first scored locally, which is cheap. Depending on the
+    policy, a section then keeps its local review or is escalated to
+    Gemini, whose unparseable scores fall back to the local ones.
+    """
+    local_scores = {}
+    if data is not None:
+        from local_scoring import score_sections
+        local_scores = score_sections(sections, data)
+    
+    policy = _review_policy["policy"]
+    local_reviews = {}
+    for section, scores in local_scores.items():
+        average = sum(scores.values()) / len(scores)
+        if policy == "local" or (policy == "auto" and (average >= _review_policy["accept_above"]
+                                                       or average < _review_policy["reject_below"])):
+            local_reviews[section] = local_review(scores)
+    
+    if local_reviews:
+        print(f"Local scores were decisive for {len(local_reviews)} of {len(sections)} sections; "
+              f"skipping their Gemini review.")
+    
+    llm_reviews = run_parallel({
+        section: (lambda section=section: review_section(section, sections[section], local_scores.get(section)))
+        for section in sections if section not in local_reviews
+    }, max_workers=max_workers)
+    
+    return {section: local_reviews.get(section) or llm_reviews[section] for section in sections}
+
+def merge_section_reviews(section_reviews):
+    """Combine per-section reviews into the press kit review result"""
+    scores = {}
+    for key in SCORE_LABELS.values():
+        values = [review["scores"][key] for review in section_reviews.values()]
+        scores[key] = round(sum(values) / len(values))
+    
+    feedback = [
+        f"{REVIEW_SECTIONS[section]}: {review['feedback']}"
+        for section, review in section_reviews.items() if review["feedback"]
+    ]
+    full_review = "\n\n".join(
+        f"{REVIEW_SECTIONS[section].upper()}\n{review['full_review']}" for section, review in section_reviews.items()
+    )
+    
+    return {
+        "scores": scores,
+        "overall_feedback": "\n\n".join(feedback) if feedback else DEFAULT_FEEDBACK,
+        "full_review": full_review,
+        "section_reviews": section_reviews
+    }
+
+def review_press_kit(content, max_workers=DEFAULT_MAX_WORKERS, per_section=True, data=None):
+    """Review the generated press kit and provide feedback
+    
+    By default every section is reviewed with its own, shorter call and the
+    calls run concurrently; sections whose text was already reviewed reuse
+    that review. With the kit `data`, sections are also scored locally and
+    the review policy decides which of them still need Gemini.
+    `per_section=False` sends the whole kit in a single call.
+    """
+    print("\n[Quality Review Phase]\n")
+    
+    if per_section:
+        section_reviews = review_sections({section: content[section] for section in REVIEW_SECTIONS},
+                                          data, max_workers)
+        return merge_section_reviews(section_reviews)
+    
+    review_prompt = f"""
+    Review the following press kit components and provide scores (0-10) and detailed feedback on:
+    1. Content Consistency
+    2. Writing Style and Tone
+    3. Layout and Structure
+    4. SEO Optimization
+    
+    Also provide overall feedback and suggestions for improvement.
+    
+    PRESS RELEASE:
+    {content['press_release']}
+    
+    COMPANY OVERVIEW:
+    {content['company_overview']}
+    
+    PR MESSAGE:
+    {content['pr_message']}
+    
+    EMAIL DRAFT:
+    {content['email_draft']}
+    {REVIEW_FORMAT}"""
+    
+    review_text = generate_text(review_prompt, section="quality_review")
+    scores, overall_feedback = parse_review_text(review_text)
     
     review_result = {
         "scores": scores,
-        "overall_feedback": overall_feedback if overall_feedback else "The content is well-written and appropriate for a press kit.",
+        "overall_feedback": overall_feedback if overall_feedback else DEFAULT_FEEDBACK,
         "full_review": review_text
     }
     
     return review_result
 
-def display_review_report(review_result):
-    """Display the review report to the user"""
+def display_review_report(review_result, ask=True):
+    """Display the review report to the user and, with `ask`, whether they want modifications"""
     print("\n[Quality Review Report]\n")
     
     for category, score in review_result["scores"].items():
@@ -115,5 +261,8 @@ def display_review_report(review_result):
     print("\nOverall Feedback:")
     print(review_result["overall_feedback"])
     
+    if not ask:
+        return False
+    
     confirmation = input("\nWould you like to request modifications based on this feedback? (Y/N): ")
-    return confirmation.upper() == 'Y'
\ No newline at end of file
+    return confirmation.upper() == 'Y'
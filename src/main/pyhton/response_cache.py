@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from call_scheduler import PartialResponseError
+
+# Cache location and limits
+CACHE_DIR = os.path.join(".cache", "pressagent")
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = None  # Seconds; None keeps entries until they are evicted
+DEFAULT_SEMANTIC_THRESHOLD = 0.9  # Input similarity above which a generated section is reused
+
+def make_cache_key(*parts):
+    """Build a stable content hash from JSON-serialisable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Disk-backed LRU cache mapping content hashes to text values"""
+    
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+    
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss or expiry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+    
+    def set(self, key, value):
+        """Store `value` under `key` and evict the least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+    
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+# Process-wide caches (Gemini responses, search results), created on first use
+_settings = {
+    "enabled": True,
+    "refresh": False,
+    "max_entries": DEFAULT_MAX_ENTRIES,
+    "ttl": DEFAULT_TTL,
+    "semantic": False,
+    "semantic_threshold": DEFAULT_SEMANTIC_THRESHOLD
+}
+_caches = {}
+_caches_lock = threading.Lock()
+
+def configure_cache(enabled=True, refresh=False, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, semantic=False,
+                    semantic_threshold=DEFAULT_SEMANTIC_THRESHOLD):
+    """Configure the shared caches
+    
+    With `enabled=False` every call goes to the API and nothing is stored.
+    With `refresh=True` cached entries are ignored but fresh responses are
+    still written, which replaces stale entries. `semantic=True` also reuses
+    sections generated for inputs at least `semantic_threshold` similar.
+    """
+    with _caches_lock:
+        _settings.update(enabled=enabled, refresh=refresh, max_entries=max_entries, ttl=ttl, semantic=semantic,
+                         semantic_threshold=semantic_threshold)
+        _caches.clear()
+
+def is_refresh_requested():
+    """Whether cached entries should be bypassed on read"""
+    return _settings["refresh"]
+
+def get_cache(name, ttl=None):
+    """Get a named shared cache, or None when caching is disabled
+    
+    `ttl` sets a default expiry for this cache; an expiry configured
+    through configure_cache takes precedence.
+    """
+    if not _settings["enabled"]:
+        return None
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = ResponseCache(
+                os.path.join(CACHE_DIR, f"{name}.sqlite"),
+                max_entries=_settings["max_entries"],
+                ttl=_settings["ttl"] if _settings["ttl"] is not None else ttl
+            )
+            _caches[name] = cache
+        return cache
+
+def get_semantic_cache():
+    """Get the shared semantic section cache, or None unless it was enabled through configure_cache"""
+    if not (_settings["enabled"] and _settings["semantic"]):
+        return None
+    with _caches_lock:
+        cache = _caches.get("semantic")
+        if cache is None:
+            # NumPy is only imported once the semantic cache is actually used
+            from semantic_cache import SemanticCache
+            cache = SemanticCache(os.path.join(CACHE_DIR, "semantic.sqlite"), _settings["semantic_threshold"],
+                                  max_entries=_settings["max_entries"], ttl=_settings["ttl"])
+            _caches["semantic"] = cache
+        return cache
+
+def get_response_cache():
+    """Get the shared Gemini response cache, or None when caching is disabled"""
+    return get_cache("responses")
+
+def _stream_text(response, chunks):
+    """Yield the text of each streamed chunk, collecting it in `chunks`
+    
+    Only failures of the stream itself are wrapped; an exception raised by
+    the consumer, such as a cancelled section, passes through unchanged.
+    """
+    try:
+        for chunk in response:
+            chunks.append(chunk.text)
+            yield chunks[-1]
+    except Exception as e:
+        # Chunks already delivered cannot be taken back, so the call is not retried
+        if chunks:
+            raise PartialResponseError(f"Stream failed after {len(chunks)} chunks: {e}") from e
+        raise
+
+def cached_generate_content(model, prompt, generation_config=None, on_chunk=None, stats=None,
+                            scheduler=None, tokens=0):
+    """Return the text of `model.generate_content(prompt)`, served from cache when possible
+    
+    When `on_chunk` is given the response is streamed and `on_chunk` is called
+    with each piece of text as it arrives; a cache hit is delivered as a
+    single chunk. If a `stats` dict is passed, it receives whether the cache
+    was hit and the token usage and finish reason reported by the API, if
+    any. A response stopped by the output token cap is not cached. With a
+    `scheduler`, the API call (but not the cache lookup) is rate-limited and
+    retried by it; `tokens` is the estimated cost of the call.
+    """
+    stats = {} if stats is None else stats
+    cache = get_response_cache()
+    key = make_cache_key(
+        model.model_name,
+        getattr(model, "_generation_config", None),
+        generation_config,
+        prompt
+    )
+    
+    stats["cache"] = "disabled" if cache is None else "miss"
+    if cache is not None and not is_refresh_requested():
+        cached = cache.get(key)
+        if cached is not None:
+            stats["cache"] = "hit"
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+    
+    kwargs = {"generation_config": generation_config} if generation_config else {}
+    
+    def request():
+        if on_chunk is None:
+            response = model.generate_content(prompt, **kwargs)
+            return response, response.text
+        
+        chunks = []
+        response = model.generate_content(prompt, stream=True, **kwargs)
+        for text in _stream_text(response, chunks):
+            on_chunk(text)
+        return response, "".join(chunks)
+    
+    if scheduler is not None:
+        # Streamed calls have side effects, so they are never hedged
+        response, text = scheduler.call(request, tokens=tokens, stats=stats, hedge=on_chunk is None)
+    else:
+        response, text = request()
+    
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        stats["prompt_tokens"] = getattr(usage, "prompt_token_count", None)
+        stats["response_tokens"] = getattr(usage, "candidates_token_count", None)
+    candidates = getattr(response, "candidates", None)
+    if candidates:
+        reason = getattr(candidates[0], "finish_reason", None)
+        stats["finish_reason"] = getattr(reason, "name", reason)
+    
+    # A truncated response would later be served as if it were complete
+    if cache is not None and stats.get("finish_reason") != "MAX_TOKENS":
+        cache.set(key, text)
+    
+    return text
@@ -0,0 +1,89 @@
+import re
+from content_generator import revise_section
+from quality_reviewer import REVIEW_SECTIONS, SCORE_LABELS, review_sections, merge_section_reviews
+from parallel import run_parallel, DEFAULT_MAX_WORKERS
+
+# Sections whose average review score is below this are revised
+DEFAULT_REVISION_THRESHOLD = 7
+
+# Revise and re-review at most this many times per request
+DEFAULT_REVISION_ROUNDS = 2
+
+# Words in a change request that name a section, besides the section's own label
+SECTION_ALIASES = {
+    "press_release": ["release", "headline"],
+    "company_overview": ["overview", "boilerplate"],
+    "pr_message": ["message"],
+    "email_draft": ["email", "e-mail", "pitch"]
+}
+
+def section_score(review):
+    """Average of a section review's scores"""
+    return sum(review["scores"].values()) / len(review["scores"])
+
+def flag_sections(review_result, threshold=DEFAULT_REVISION_THRESHOLD):
+    """Sections the per-section review scored below `threshold`"""
+    return [
+        section for section, review in review_result.get("section_reviews", {}).items()
+        if section_score(review) < threshold
+    ]
+
+def requested_sections(request):
+    """Sections a change request names, e.g. 'shorten the email' names the email draft"""
+    text = request.lower()
+    return [
+        section for section, label in REVIEW_SECTIONS.items()
+        if any(re.search(rf"\b{re.escape(name)}\b", text) for name in [label.lower()] + SECTION_ALIASES[section])
+    ]
+
+def _revision_instructions(review, request=""):
+    """The prompt delta for one section: its review feedback plus the user's request"""
+    instructions = [f"{label} {review['scores'][key]}/10" for label, key in SCORE_LABELS.items()]
+    if review["feedback"]:
+        instructions.append(f"Reviewer feedback: {review['feedback']}")
+    if request:
+        instructions.append(f"Requested changes: {request}")
+    return "\n    ".join(instructions)
+
+def revise_press_kit(data, content, review_result, request="", threshold=DEFAULT_REVISION_THRESHOLD,
+                     max_rounds=DEFAULT_REVISION_ROUNDS, max_workers=DEFAULT_MAX_WORKERS, sections=None):
+    """Regenerate the requested or low-scoring sections with their feedback, then re-review just those
+    
+    A user `request` is applied in the first round to `sections`, by default
+    the sections it names, alongside the sections below `threshold`. Rounds
+    repeat until no section scores below `threshold` or `max_rounds` is used
+    up. Returns the updated content and review result.
+    """
+    if "section_reviews" not in review_result:
+        print("\nThe review has no per-section scores, so no sections can be targeted.")
+        return content, review_result
+    
+    content = dict(content)
+    targeted = []
+    if request:
+        targeted = [s for s in (sections if sections is not None else requested_sections(request))
+                    if s in review_result["section_reviews"]]
+    for round_number in range(1, max_rounds + 1):
+        section_reviews = review_result["section_reviews"]
+        low_scoring = flag_sections(review_result, threshold)
+        flagged = [section for section in REVIEW_SECTIONS if section in targeted or section in low_scoring]
+        if not flagged:
+            print(f"\nEvery section scores at least {threshold}/10; nothing to revise.")
+            break
+        
+        print(f"\n[Revision Round {round_number}] Revising: {', '.join(REVIEW_SECTIONS[s] for s in flagged)}")
+        content.update(run_parallel({
+            section: (lambda section=section: revise_section(
+                data, section, content[section],
+                _revision_instructions(section_reviews[section], request if section in targeted else "")
+            ))
+            for section in flagged
+        }, max_workers=max_workers))
+        
+        # Unchanged sections keep their earlier reviews
+        section_reviews = dict(section_reviews)
+        section_reviews.update(review_sections({section: content[section] for section in flagged}, data, max_workers))
+        review_result = merge_section_reviews(section_reviews)
+        targeted = []
+    
+    return content, review_result
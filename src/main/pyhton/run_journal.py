@@ -0,0 +1,64 @@
+import json
+import os
+import re
+import time
+import uuid
+
+# Every run keeps the output of each finished stage here, one JSON file per stage
+JOURNAL_DIR = os.path.join("output", "runs")
+
+def new_run_id():
+    """A sortable, unique id for a new run"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+def _safe_name(name):
+    """Turn a run, record or stage id into a file name"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", str(name)) or "_"
+
+class RunJournal:
+    """Persists the output of each pipeline stage so a failed run can be resumed"""
+    
+    def __init__(self, run_id, path):
+        self.run_id = run_id
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+    
+    def _stage_path(self, stage):
+        return os.path.join(self.path, f"{_safe_name(stage)}.json")
+    
+    def has(self, stage):
+        return os.path.exists(self._stage_path(stage))
+    
+    def load(self, stage):
+        with open(self._stage_path(stage), encoding="utf-8") as f:
+            return json.load(f)
+    
+    def save(self, stage, value):
+        """Write a stage's output; the file only appears once it is complete"""
+        path = self._stage_path(stage)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        return value
+    
+    def stage(self, stage, compute):
+        """Return the journaled output of `stage`, or compute and journal it"""
+        if self.has(stage):
+            print(f"[Resume] Reusing the saved {stage} stage of run {self.run_id}")
+            return self.load(stage)
+        return self.save(stage, compute())
+    
+    def child(self, name):
+        """A journal nested in this one, e.g. for one record of a batch run"""
+        return RunJournal(self.run_id, os.path.join(self.path, _safe_name(name)))
+
+def open_journal(resume=None):
+    """Start the journal of a new run, or reopen an earlier run's journal with `resume`"""
+    if resume is None:
+        run_id = new_run_id()
+    else:
+        run_id = resume
+        if not os.path.isdir(os.path.join(JOURNAL_DIR, _safe_name(run_id))):
+            raise ValueError(f"no journal found for run '{run_id}' in {JOURNAL_DIR}")
+    return RunJournal(run_id, os.path.join(JOURNAL_DIR, _safe_name(run_id)))
@@ -0,0 +1,225 @@
+import json
+import re
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+from news_ranking import tokenize
+from response_cache import make_cache_key
+
+# Fields of the kit each section's prompt is built from, with their weight in
+# the similarity. Fields in EXACT_FIELDS must match exactly for an entry to
+# be reused, so a cached text never names the wrong company or style.
+SECTION_FIELDS = {
+    "press_release": {"product": 2, "topic": 3, "achievements": 2, "brand_attributes": 1, "target_media": 1,
+                      "tone": 1, "supplementary": 1},
+    "company_overview": {"product": 2, "achievements": 2, "brand_attributes": 1},
+    "pr_message": {"topic": 3, "target_media": 1, "tone": 1},
+    "email_draft": {"topic": 3, "target_media": 1, "tone": 1}
+}
+EXACT_FIELDS = ["name", "style"]
+
+# Numbers, versions and figures in these fields must match exactly as well:
+# "Widget 2.0 launch" and "Widget 3.0 launch" are similar wording but different facts
+FIGURE_FIELDS = ["product", "topic", "achievements"]
+FIGURE = re.compile(r"\d+(?:[.,]\d+)*")
+
+# Hashed feature space of the vectorizer; the fields are short, so collisions are rare
+# and a small space keeps a lookup over thousands of entries well under a millisecond
+DIMENSIONS = 1 << 10
+
+def _normalize_list(value):
+    """Lowercase a free-text list and sort its items, so 'Fast, Reliable' equals 'reliable; fast'"""
+    items = [item.strip() for item in str(value).lower().replace(";", ",").split(",")]
+    return ", ".join(sorted(item for item in items if item))
+
+def kit_fields(section, data, style=None):
+    """The normalized inputs of one section's prompt"""
+    company = data["company_info"]
+    press_kit = data["press_kit_info"]
+    values = {
+        "name": " ".join(company["name"].lower().split()),
+        "style": (style or "").lower() if section == "press_release" else "",
+        "product": company["product"],
+        "achievements": _normalize_list(company["achievements"]),
+        "brand_attributes": _normalize_list(company["brand_attributes"]),
+        "topic": press_kit["topic"],
+        "target_media": _normalize_list(press_kit["target_media"]),
+        "tone": press_kit["tone"].lower(),
+        "supplementary": " ".join(item["title"] for item in data.get("supplementary_data") or [])
+    }
+    return {field: values[field] for field in EXACT_FIELDS + list(SECTION_FIELDS[section])}
+
+def figures(fields):
+    """The numbers in a section's factual fields, in a canonical form"""
+    found = set()
+    for field in FIGURE_FIELDS:
+        found.update(FIGURE.findall(str(fields.get(field, ""))))
+    return " ".join(sorted(found))
+
+def embed(section, fields):
+    """Unit-length hashed bag-of-words vector of a section's fields
+    
+    Each field is normalized on its own and scaled by the square root of its
+    share of the weight, so the dot product of two vectors is the weighted
+    average of the per-field cosine similarities.
+    """
+    weights = SECTION_FIELDS[section]
+    total = sum(weights.values())
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for field, weight in weights.items():
+        # Sorted unique terms make the vector independent of word order
+        tokens = sorted(set(tokenize(fields[field]))) or ["<empty>"]
+        columns = [zlib.crc32(f"{field}:{token}".encode("utf-8")) % DIMENSIONS for token in tokens]
+        field_vector = np.zeros(DIMENSIONS, dtype=np.float32)
+        np.add.at(field_vector, columns, 1.0)
+        vector += field_vector / np.linalg.norm(field_vector) * np.sqrt(weight / total)
+    return vector / np.linalg.norm(vector)
+
+class SemanticCache:
+    """Approximate cache of generated sections, keyed on the similarity of their inputs
+    
+    Entries are kept in SQLite with their embeddings and loaded into an
+    in-memory index on first use: one matrix of embeddings per section,
+    company, style and set of figures, so a lookup is a single
+    matrix-vector product. Like ResponseCache, it keeps at most
+    `max_entries` entries, evicting the least recently used, and expires
+    entries older than `ttl` seconds.
+    """
+    
+    def __init__(self, path, threshold, max_entries=None, ttl=None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self.stats = {}
+        
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(entries)")]
+        if columns and "key" not in columns:
+            # Entries from before keys and embeddings were stored; a cache can simply start over
+            self._conn.execute("DROP TABLE entries")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, section TEXT NOT NULL, fields TEXT NOT NULL, vector BLOB NOT NULL, "
+            "value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+    
+    @staticmethod
+    def _partition(section, fields):
+        return (section,) + tuple(fields[field] for field in EXACT_FIELDS) + (figures(fields),)
+    
+    def _load(self):
+        """Build the in-memory index from the stored, unexpired entries"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        self._index = {}
+        for key, section, fields, vector, value, created_at in self._conn.execute(
+            "SELECT key, section, fields, vector, value, created_at FROM entries"
+        ):
+            vector = np.frombuffer(vector, dtype=np.float32)
+            fields = json.loads(fields)
+            if vector.shape != (DIMENSIONS,):
+                vector = embed(section, fields)
+            self._add(key, section, fields, vector, value, created_at)
+    
+    def _add(self, key, section, fields, vector, value, created_at):
+        entry = self._index.setdefault(self._partition(section, fields),
+                                       {"keys": [], "vectors": [], "values": [], "created": [], "matrix": None})
+        if key in entry["keys"]:
+            position = entry["keys"].index(key)
+            entry["vectors"][position] = vector
+            entry["values"][position] = value
+            entry["created"][position] = created_at
+        else:
+            entry["keys"].append(key)
+            entry["vectors"].append(vector)
+            entry["values"].append(value)
+            entry["created"].append(created_at)
+        entry["matrix"] = None
+    
+    def _count(self, section, outcome):
+        counts = self.stats.setdefault(section, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+    
+    def lookup(self, section, fields):
+        """Return (text, similarity) of the most similar earlier generation above the threshold, or (None, best)"""
+        query = embed(section, fields)
+        now = time.time()
+        with self._lock:
+            if self._index is None:
+                self._load()
+            entry = self._index.get(self._partition(section, fields))
+            best = 0.0
+            if entry is not None:
+                if entry["matrix"] is None:
+                    entry["matrix"] = np.vstack(entry["vectors"])
+                similarities = entry["matrix"] @ query
+                if self.ttl is not None:
+                    similarities[np.asarray(entry["created"]) < now - self.ttl] = -1
+                position = int(np.argmax(similarities))
+                best = max(0.0, float(similarities[position]))
+                if best >= self.threshold:
+                    self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                                       (now, entry["keys"][position]))
+                    self._conn.commit()
+                    self._count(section, "hits")
+                    return entry["values"][position], best
+            self._count(section, "misses")
+            return None, best
+    
+    def store(self, section, fields, value):
+        """Add a generated section to the index and to disk, replacing any entry for the same inputs"""
+        key = make_cache_key(section, fields)
+        vector = embed(section, fields)
+        now = time.time()
+        with self._lock:
+            if self._index is None:
+                self._load()
+            self._add(key, section, fields, vector, value, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, section, fields, vector, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, section, json.dumps(fields, sort_keys=True), vector.tobytes(), value, now, now)
+            )
+            evicted = 0
+            if self.max_entries:
+                evicted = self._conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+            if evicted:
+                # Rebuilt from disk on the next lookup, without the evicted entries
+                self._index = None
+    
+    def hit_rates(self):
+        """Hits, misses and hit rate per section"""
+        with self._lock:
+            return {
+                section: {**counts, "hit_rate": counts["hits"] / max(1, counts["hits"] + counts["misses"])}
+                for section, counts in self.stats.items()
+            }
+    
+    def display_stats(self):
+        """Print the hit rate of every section looked up in this process"""
+        rates = self.hit_rates()
+        if not rates:
+            return
+        
+        print("\n[Semantic Cache]\n")
+        print(f"{'Section':<20} {'Hits':>6} {'Misses':>8} {'Hit rate':>10}")
+        for section, counts in rates.items():
+            print(f"{section:<20} {counts['hits']:>6} {counts['misses']:>8} {counts['hit_rate']:>9.0%}")
@@ -0,0 +1,237 @@
+import json
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import DEFAULT_FORMAT
+from batch import normalize_record, run_record, DEFAULT_BATCH_WORKERS
+from gemini_client import configure_gemini
+from parallel import DEFAULT_MAX_WORKERS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Jobs waiting for a worker; further submissions are rejected with 429 until one frees up
+DEFAULT_QUEUE_SIZE = 32
+
+# Finished jobs kept so their status and results can still be fetched
+MAX_FINISHED_JOBS = 1000
+
+# Seconds a client is asked to wait before retrying a rejected submission
+RETRY_AFTER_SECONDS = 5
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+class QueueFullError(Exception):
+    """The job queue is at capacity"""
+
+class Job:
+    """One press kit request and its progress"""
+    
+    def __init__(self, record):
+        self.id = uuid.uuid4().hex
+        self.record = record
+        self.status = "queued"
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0
+        self.changed = threading.Condition()
+    
+    def update(self, **fields):
+        """Change the job's state and wake up clients following its events"""
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+    
+    def to_dict(self):
+        job = {
+            "id": self.id,
+            "record_id": self.record["id"],
+            "status": self.status,
+            "stage": self.stage,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+        if self.result is not None:
+            job["result"] = self.result
+        if self.error is not None:
+            job["error"] = self.error
+        return job
+
+class JobQueue:
+    """Bounded queue of press kit jobs processed by a fixed pool of worker threads"""
+    
+    def __init__(self, workers=DEFAULT_BATCH_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_workers=DEFAULT_MAX_WORKERS, mode="standard"):
+        self.max_workers = max_workers
+        self.mode = mode
+        self.workers = workers
+        self._pending = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"press-kit-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def submit(self, record):
+        """Queue a normalized record; raises QueueFullError instead of blocking"""
+        job = Job(record)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+        try:
+            self._pending.put_nowait(job)
+        except queue.Full:
+            with self._jobs_lock:
+                del self._jobs[job.id]
+            raise QueueFullError(f"{self._pending.maxsize} jobs are already queued")
+        return job
+    
+    def get(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+    
+    def stats(self):
+        with self._jobs_lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queued": self._pending.qsize(),
+            "queue_size": self._pending.maxsize,
+            "running": statuses.count("running"),
+            "succeeded": statuses.count("succeeded"),
+            "failed": statuses.count("failed")
+        }
+    
+    def _forget_finished(self):
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS"""
+        with self._jobs_lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self._jobs[job_id]
+    
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            job.update(status="running", started=time.time())
+            try:
+                result = run_record(job.record, self.max_workers, self.mode,
+                                    on_stage=lambda stage, job=job: job.update(stage=stage))
+                job.update(status="succeeded", result=result, finished=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                job.update(status="failed", error=str(e), finished=time.time())
+            finally:
+                self._pending.task_done()
+            self._forget_finished()
+
+class PressKitHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs/<id>, GET /jobs/<id>/events and GET /health"""
+    
+    server_version = "PressAgent"
+    
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _job_from_path(self):
+        parts = self.path.strip("/").split("/")
+        job = self.server.jobs.get(parts[1]) if len(parts) >= 2 and parts[0] == "jobs" else None
+        if job is None:
+            self._send_json(404, {"error": "job not found"})
+        return job, parts[2:]
+    
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_record = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(raw_record, dict):
+                raise ValueError("request body must be a JSON object")
+            record = normalize_record(raw_record, uuid.uuid4().hex[:8], self.server.default_formats,
+                                      self.server.default_locales)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        
+        try:
+            job = self.server.jobs.submit(record)
+        except QueueFullError as e:
+            self._send_json(429, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+        
+        self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+    
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, self.server.jobs.stats())
+            return
+        
+        job, rest = self._job_from_path()
+        if job is None:
+            return
+        if not rest:
+            self._send_json(200, job.to_dict())
+        elif rest == ["events"]:
+            self._stream_events(job)
+        else:
+            self._send_json(404, {"error": "not found"})
+    
+    def _stream_events(self, job):
+        """Send one JSON line per state change until the job finishes"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        
+        seen = -1
+        while True:
+            with job.changed:
+                job.changed.wait_for(lambda: job.version != seen)
+                seen = job.version
+                event = job.to_dict()
+            try:
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            if event["status"] in FINISHED_STATUSES:
+                return
+    
+    def log_message(self, format, *args):
+        print(f"[Service] {self.address_string()} {format % args}")
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_BATCH_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                  max_workers=DEFAULT_MAX_WORKERS, default_formats=(DEFAULT_FORMAT,), mode="standard",
+                  default_locales=()):
+    """Create the HTTP server and its job workers; call serve_forever() on the result"""
+    configure_gemini()
+    
+    server = ThreadingHTTPServer((host, port), PressKitHandler)
+    server.daemon_threads = True
+    server.jobs = JobQueue(workers, queue_size, max_workers, mode)
+    server.default_formats = list(default_formats)
+    server.default_locales = list(default_locales)
+    return server
@@ -0,0 +1,101 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import click
+
+# Directory holding the PressAgent modules; every measurement runs from here
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cold-start budget for importing the CLI, in milliseconds
+DEFAULT_BUDGET_MS = 250
+
+# Dependencies that must only be imported when first used, never at start-up
+HEAVY_MODULES = ["google.generativeai", "google.api_core", "grpc", "serpapi", "requests", "fpdf", "numpy"]
+
+def parse_importtime(stderr):
+    """Parse `python -X importtime` output into (module, self_us, cumulative_us, depth) tuples"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+def measure_import(module):
+    """Import `module` in a fresh interpreter and return its -X importtime records"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=MODULE_DIR, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise click.ClickException(f"importing {module} failed:\n{completed.stderr.strip().splitlines()[-1]}")
+    return parse_importtime(completed.stderr)
+
+def measure_help():
+    """Wall time in seconds of `main.py --help` in a fresh interpreter"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--help"], cwd=MODULE_DIR, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+@click.command()
+@click.option('--runs', '-n', type=click.IntRange(min=1), default=5, help='Fresh interpreters started per measurement')
+@click.option('--module', default='cli', show_default=True, help='Module whose import time is measured')
+@click.option('--budget-ms', type=click.IntRange(min=1), default=DEFAULT_BUDGET_MS, show_default=True,
+              help='Fail when the median import time exceeds this many milliseconds')
+@click.option('--top', type=click.IntRange(min=0), default=10, help='Slowest imports to list')
+@click.option('--json-output', type=click.Path(dir_okay=False), default=None, help='Also write the results as JSON')
+def main(runs, module, budget_ms, top, json_output):
+    """Measure PressAgent cold-start time and check it against a budget"""
+    import_times = []
+    help_times = []
+    for _ in range(runs):
+        imports = measure_import(module)
+        import_times.append(next(cumulative for name, _, cumulative, depth in imports
+                                 if name == module and depth == 0) / 1000)
+        help_times.append(measure_help())
+    
+    loaded_heavy = [
+        heavy for heavy in HEAVY_MODULES
+        if any(name == heavy or name.startswith(heavy + ".") for name, _, _, _ in imports)
+    ]
+    slowest = sorted(imports, key=lambda record: -record[1])[:top]
+    median_import = statistics.median(import_times)
+    
+    print(f"\n[Startup Benchmark] {runs} runs\n")
+    print(f"import {module:<12} median {median_import:8.1f} ms   min {min(import_times):8.1f} ms   "
+          f"budget {budget_ms} ms")
+    print(f"main.py --help      median {statistics.median(help_times) * 1000:8.1f} ms   "
+          f"min {min(help_times) * 1000:8.1f} ms")
+    
+    if slowest:
+        print("\nSlowest imports (self time, last run):")
+        for name, self_us, cumulative_us, _ in slowest:
+            print(f"  {self_us / 1000:7.1f} ms  {cumulative_us / 1000:7.1f} ms cumulative  {name}")
+    
+    if json_output:
+        with open(json_output, "w") as f:
+            json.dump({
+                "module": module,
+                "import_ms": import_times,
+                "help_ms": [t * 1000 for t in help_times],
+                "budget_ms": budget_ms,
+                "heavy_modules_loaded": loaded_heavy
+            }, f, indent=2)
+        print(f"\nResults saved at: {json_output}")
+    
+    failures = []
+    if median_import > budget_ms:
+        failures.append(f"median import time {median_import:.1f} ms exceeds the {budget_ms} ms budget")
+    if loaded_heavy:
+        failures.append(f"imported at start-up: {', '.join(loaded_heavy)}")
+    if failures:
+        raise click.ClickException("; ".join(failures))
+    print("\nWithin budget.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Tracing is off until enable_tracing() is called; spans are then kept in memory
+# and written out by write_trace()
+_tracer = None
+_thread_state = threading.local()
+
+class Tracer:
+    """Collects timed spans for LLM calls, searches, rendering and pipeline stages"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+    
+    def record(self, name, category, started, duration, attrs):
+        """Store one finished span; `started` is a time.perf_counter() value"""
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "category": category,
+                "start": started - self.origin,
+                "duration": duration,
+                "thread": threading.get_ident(),
+                "attrs": attrs
+            })
+    
+    def write(self):
+        """Write spans as Chrome trace JSON (.json) or JSON lines (any other extension)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._lock:
+            spans = list(self.spans)
+        
+        with open(self.path, "w") as f:
+            if self.path.endswith(".json"):
+                events = [{
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 1e6),
+                    "dur": round(span["duration"] * 1e6),
+                    "pid": os.getpid(),
+                    "tid": span["thread"],
+                    "args": span["attrs"]
+                } for span in spans]
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            else:
+                for span in spans:
+                    f.write(json.dumps(span, default=str) + "\n")
+
+def enable_tracing(path):
+    """Start recording spans for this process; they are saved to `path` by write_trace"""
+    global _tracer
+    _tracer = Tracer(path)
+    return _tracer
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used when the API reports none"""
+    return max(1, len(text) // 4) if text else 0
+
+def mark_queued(queued_at):
+    """Remember when the task now starting on this thread was queued"""
+    _thread_state.queue_time = time.perf_counter() - queued_at
+
+def take_queue_time():
+    """Return and clear the queueing delay of the current task"""
+    queue_time = getattr(_thread_state, "queue_time", 0.0)
+    _thread_state.queue_time = 0.0
+    return queue_time
+
+@contextlib.contextmanager
+def span(name, category, **attrs):
+    """Time the enclosed block; the yielded dict can be filled with extra attributes"""
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if _tracer is not None:
+            _tracer.record(name, category, started, time.perf_counter() - started, attrs)
+
+def record_span(name, category, started, duration, **attrs):
+    """Record a span measured by the caller"""
+    if _tracer is not None:
+        _tracer.record(name, category, started, duration, attrs)
+
+def write_trace():
+    """Write the recorded spans to the trace file, if tracing is enabled"""
+    if _tracer is not None:
+        _tracer.write()
+        return _tracer.path
+    return None
+
+def display_trace_summary():
+    """Print a per-span summary of time, tokens and cache use"""
+    if _tracer is None or not _tracer.spans:
+        return
+    
+    groups = {}
+    for entry in _tracer.spans:
+        # Per-style and per-section LLM spans are grouped by their call site
+        name = entry["name"].split(":")[0] if entry["category"] == "llm" else entry["name"]
+        key = (entry["category"], name)
+        groups.setdefault(key, []).append(entry)
+    
+    print("\n[Profile Summary]\n")
+    print(f"{'Category':<8} {'Name':<26} {'Calls':>5} {'Total':>9} {'Max':>8} {'Queue':>8} "
+          f"{'Tokens in/out':>15} {'Cache hit':>9} {'Retries':>7}")
+    for (category, name), entries in sorted(groups.items(), key=lambda item: -sum(e["duration"] for e in item[1])):
+        attrs = [e["attrs"] for e in entries]
+        total = sum(e["duration"] for e in entries)
+        longest = max(e["duration"] for e in entries)
+        queue = sum(a.get("queue_time", 0.0) for a in attrs)
+        tokens_in = sum(a.get("prompt_tokens", 0) for a in attrs)
+        tokens_out = sum(a.get("response_tokens", 0) for a in attrs)
+        lookups = [a["cache"] for a in attrs if a.get("cache") in ("hit", "miss")]
+        hit_rate = f"{lookups.count('hit')}/{len(lookups)}" if lookups else "-"
+        retries = sum(a.get("retries", 0) for a in attrs)
+        tokens = f"{tokens_in}/{tokens_out}" if tokens_in or tokens_out else "-"
+        print(f"{category:<8} {name[:26]:<26} {len(entries):>5} {total:>8.2f}s {longest:>7.2f}s {queue:>7.2f}s "
+              f"{tokens:>15} {hit_rate:>9} {retries:>7}")